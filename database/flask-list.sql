@@ -2,49 +2,88 @@ CREATE TABLE alembic_version (
 	version_num VARCHAR(32) NOT NULL, 
 	CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
 );
-CREATE TABLE list (
-	list_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, 
-	name VARCHAR(1000) NOT NULL, 
-	created_by INTEGER NOT NULL, 
-	private BOOLEAN NOT NULL, 
-	version_id VARCHAR(32) NOT NULL
-);
 CREATE TABLE sqlite_sequence(name,seq);
-CREATE UNIQUE INDEX ix_list_list_id ON list (list_id);
-CREATE UNIQUE INDEX ix_list_name ON list (name);
-CREATE TABLE user (
+CREATE TABLE IF NOT EXISTS "user" (
 	user_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, 
 	email VARCHAR(1000) NOT NULL, 
 	password_hash VARCHAR(128) NOT NULL, 
 	active BOOLEAN NOT NULL, 
 	updated_on DATETIME NOT NULL, 
-	version_id VARCHAR(32) NOT NULL
+	version_id INTEGER NOT NULL
 );
 CREATE UNIQUE INDEX ix_user_email ON user (email);
-CREATE UNIQUE INDEX ix_user_user_id ON user (user_id);
-CREATE TABLE category (
-	category_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, 
+CREATE TABLE IF NOT EXISTS "list" (
+	list_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, 
 	name VARCHAR(1000) NOT NULL, 
-	version_id VARCHAR(32) NOT NULL, 
-	list_id INTEGER NOT NULL, 
-	FOREIGN KEY(list_id) REFERENCES list (list_id), 
-	UNIQUE (list_id, name)
-);
-CREATE UNIQUE INDEX ix_category_category_id ON category (category_id);
-CREATE INDEX ix_category_list_id ON category (list_id);
-CREATE INDEX ix_category_name ON category (name);
-CREATE TABLE item (
+	created_by INTEGER NOT NULL, 
+	private BOOLEAN NOT NULL, 
+	version_id INTEGER NOT NULL, 
+	revision INTEGER DEFAULT '0' NOT NULL, 
+	updated_on DATETIME DEFAULT '1970-01-01 00:00:00' NOT NULL, 
+	cleaned_change_id INTEGER DEFAULT '0' NOT NULL, 
+	category_count INTEGER DEFAULT '0' NOT NULL, 
+	item_count INTEGER DEFAULT '0' NOT NULL
+, deleting BOOLEAN DEFAULT '0' NOT NULL);
+CREATE INDEX ix_list_private_name ON list (private, name);
+CREATE INDEX ix_list_created_by_name ON list (created_by, name);
+CREATE TABLE IF NOT EXISTS "item" (
 	item_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, 
 	name VARCHAR(1000) NOT NULL, 
-	type VARCHAR(9) NOT NULL, 
+	type SMALLINT NOT NULL, 
 	selection BOOLEAN NOT NULL, 
-	number VARCHAR(1000) NOT NULL, 
 	text VARCHAR(1000) NOT NULL, 
-	version_id VARCHAR(32) NOT NULL, 
+	version_id INTEGER NOT NULL, 
 	category_id INTEGER NOT NULL, 
+	list_id INTEGER NOT NULL, 
+	number BIGINT NOT NULL, 
+	CONSTRAINT fk_item_list_id_list FOREIGN KEY(list_id) REFERENCES list (list_id), 
 	FOREIGN KEY(category_id) REFERENCES category (category_id), 
 	UNIQUE (category_id, name)
 );
 CREATE INDEX ix_item_category_id ON item (category_id);
-CREATE UNIQUE INDEX ix_item_item_id ON item (item_id);
+CREATE INDEX ix_item_list_id ON item (list_id);
 CREATE INDEX ix_item_name ON item (name);
+CREATE TABLE IF NOT EXISTS "change" (
+	change_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, 
+	list_id INTEGER NOT NULL, 
+	entity VARCHAR(8) NOT NULL, 
+	entity_id INTEGER NOT NULL, 
+	operation VARCHAR(6) NOT NULL, 
+	version_id INTEGER, 
+	fields JSON NOT NULL, 
+	created_on DATETIME NOT NULL
+);
+CREATE INDEX ix_change_list_id ON change (list_id);
+CREATE TABLE email (
+	email_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, 
+	subject VARCHAR(1000) NOT NULL, 
+	sender VARCHAR(1000) NOT NULL, 
+	recipients JSON NOT NULL, 
+	text_body TEXT NOT NULL, 
+	html_body TEXT NOT NULL, 
+	attempts INTEGER NOT NULL, 
+	send_after DATETIME NOT NULL, 
+	last_error VARCHAR(1000), 
+	created_on DATETIME NOT NULL
+);
+CREATE INDEX ix_email_send_after ON email (send_after);
+CREATE INDEX ix_list_deleting ON list (deleting);
+CREATE UNIQUE INDEX ix_list_name ON list (name) WHERE deleting = 0;
+CREATE TABLE IF NOT EXISTS "category" (
+	category_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, 
+	name VARCHAR(1000) NOT NULL, 
+	version_id INTEGER NOT NULL, 
+	list_id INTEGER NOT NULL, 
+	revision INTEGER DEFAULT '0' NOT NULL, 
+	selection_count INTEGER DEFAULT '0' NOT NULL, 
+	selected_count INTEGER DEFAULT '0' NOT NULL, 
+	number_count INTEGER DEFAULT '0' NOT NULL, 
+	number_sum BIGINT DEFAULT '0' NOT NULL, 
+	item_count INTEGER DEFAULT '0' NOT NULL, 
+	deleting BOOLEAN DEFAULT '0' NOT NULL, 
+	FOREIGN KEY(list_id) REFERENCES list (list_id)
+);
+CREATE INDEX ix_category_list_id ON category (list_id);
+CREATE INDEX ix_category_deleting ON category (deleting);
+CREATE INDEX ix_category_name ON category (name);
+CREATE UNIQUE INDEX ix_category_list_id_name ON category (list_id, name) WHERE deleting = 0;
@@ -1,3 +1,5 @@
+from functools import partial
+
 from flask import Flask
 from flask_bootstrap import Bootstrap5
 from flask_caching import Cache
@@ -10,10 +12,16 @@ from flask_talisman import Talisman
 from flask_wtf.csrf import CSRFProtect
 from jinja2 import select_autoescape
 from sqlalchemy import event
-from sqlalchemy.engine import Engine
+
+from flask_list.broker import Broker
+from flask_list.budget import QueryBudget
+from flask_list.instrumentation import Instrumentation
+from flask_list.recorder import Recorder
 
 database = SQLAlchemy()
 migrate = Migrate()
+instrumentation = Instrumentation()
+query_budget = QueryBudget()
 
 csrf = CSRFProtect()
 login = LoginManager()
@@ -24,14 +32,67 @@ bootstrap = Bootstrap5()
 cache = Cache()
 mail = Mail()
 
+broker = Broker()
+recorder = Recorder()
+
 
-@event.listens_for(Engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
+# wal: the readers don't wait for the writer, the writers wait busy_timeout ms
+# for the lock instead of failing; the configuration overrides the pragmas,
+# None removes one
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -16 * 1024,  # kibibytes
+    "temp_store": "MEMORY",
+}
+
+
+def set_sqlite_pragma(pragmas, dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
     cursor.close()
 
 
+def optimize_sqlite(dbapi_connection, connection_record):
+    # updates the statistics of the query planner if needed, usually a no-op
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA optimize")
+    cursor.close()
+
+
+def init_sqlite(application):
+    pragmas = {
+        name: value
+        for name, value in {
+            **SQLITE_PRAGMAS,
+            **application.config.get("SQLITE_PRAGMAS", {}),
+        }.items()
+        if value is not None
+    }
+
+    with application.app_context():
+        for engine in database.engines.values():
+            if engine.dialect.name != "sqlite":
+                continue
+
+            event.listen(engine, "connect", partial(set_sqlite_pragma, pragmas))
+            if application.config.get("SQLITE_OPTIMIZE", True):
+                event.listen(engine, "close", optimize_sqlite)
+
+
+def keep_not_modified_policy(response):
+    # a not modified page is shown from the browser cache with its nonces, the
+    # content security policy of the cached page must not be replaced
+    if response.status_code == 304:
+        response.headers.pop("Content-Security-Policy", None)
+
+    return response
+
+
 def create_application(instance_path, config_file="flask-list.conf"):
     if instance_path:
         application = Flask(
@@ -56,7 +117,13 @@ def create_application(instance_path, config_file="flask-list.conf"):
     )
 
     database.init_app(application)
+    init_sqlite(application)
     migrate.init_app(application, database)
+    instrumentation.init_app(application)
+    query_budget.init_app(application)
+
+    # registered before talisman as the after request functions run in reverse
+    application.after_request(keep_not_modified_policy)
 
     csrf.init_app(application)
     login.init_app(application)
@@ -79,9 +146,11 @@ def create_application(instance_path, config_file="flask-list.conf"):
 
     bootstrap.init_app(application)
     cache.init_app(application)
-    cache.cache._client.behaviors.update({"tcp_nodelay": True, "tcp_keepalive": True})
     mail.init_app(application)
 
+    broker.init_app(application)
+    recorder.init_app(application)
+
     from flask_list.auth import blueprint as auth_blueprint
 
     application.register_blueprint(auth_blueprint, url_prefix="/auth")
@@ -90,6 +159,10 @@ def create_application(instance_path, config_file="flask-list.conf"):
 
     application.register_blueprint(category_blueprint, url_prefix="/category")
 
+    from flask_list.dev import blueprint as dev_blueprint
+
+    application.register_blueprint(dev_blueprint)
+
     from flask_list.item import blueprint as item_blueprint
 
     application.register_blueprint(item_blueprint, url_prefix="/item")
@@ -98,7 +171,12 @@ def create_application(instance_path, config_file="flask-list.conf"):
 
     application.register_blueprint(list_blueprint, url_prefix="/list")
 
+    from flask_list.outbox import blueprint as outbox_blueprint
+
+    application.register_blueprint(outbox_blueprint)
+
     return application
 
 
+from flask_list import index_report  # noqa: E402, F401
 from flask_list import models  # noqa: E402, F401
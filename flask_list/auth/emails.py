@@ -1,24 +1,11 @@
-from threading import Thread
-
 from flask import current_app, render_template
-from flask_mail import Message
-
-from flask_list import mail
 
-
-def send_async_email(application, message):
-    with application.app_context():
-        mail.send(message)
+from flask_list.outbox.sender import queue_email
 
 
 def send_email(subject, sender, recipients, text_body, html_body):
-    message = Message(subject, sender=sender, recipients=recipients)
-    message.body = text_body
-    message.html = html_body
-
-    Thread(
-        target=send_async_email, args=(current_app._get_current_object(), message)
-    ).start()
+    # queued in the outbox, sent by the background sender or flask mail flush
+    queue_email(subject, sender, recipients, text_body, html_body)
 
 
 def send_register_email(user):
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from threading import Event, Lock
+from time import monotonic
+from uuid import uuid4
+
+from flask import current_app
+
+from flask_list import cache
+
+
+class Load:
+    __slots__ = ("done", "principal")
+
+    def __init__(self):
+        self.done = Event()
+        self.principal = None
+
+
+class PrincipalCache:
+    # two tiers: a small lru of the process in front of the shared cache; the
+    # logouts and the password changes replace the shared version of the user,
+    # an entry of the process is only used while it has the shared version and
+    # expires after a few seconds anyway
+
+    def __init__(self):
+        self.lock = Lock()
+        self.entries = OrderedDict()
+        self.loads = {}
+
+    @staticmethod
+    def get_key(user_id):
+        return f"principal_{user_id}"
+
+    @staticmethod
+    def get_version_key(user_id):
+        return f"principal_version_{user_id}"
+
+    def get_local(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < monotonic():
+                del self.entries[user_id]
+                return None
+
+        # read without the lock, a small value instead of the principal
+        if cache.get(self.get_version_key(user_id)) != entry[2]:
+            with self.lock:
+                if self.entries.get(user_id) is entry:
+                    del self.entries[user_id]
+            return None
+
+        with self.lock:
+            if user_id in self.entries:
+                self.entries.move_to_end(user_id)
+        return entry[1]
+
+    def set_local(self, principal, version):
+        timeout = current_app.config.get("PRINCIPAL_CACHE_TIMEOUT", 5)
+        size = current_app.config.get("PRINCIPAL_CACHE_SIZE", 1024)
+        with self.lock:
+            # a principal read before a change doesn't replace the changed one
+            entry = self.entries.get(principal.user_id)
+            if entry is not None and entry[1].version_id > principal.version_id:
+                return
+
+            self.entries[principal.user_id] = (
+                monotonic() + timeout,
+                principal,
+                version,
+            )
+            self.entries.move_to_end(principal.user_id)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+
+    def get(self, user_id, load):
+        principal = self.get_local(user_id)
+        if principal is not None:
+            return principal
+
+        # single flight: one request of the process reads the shared cache or
+        # the database, the concurrent requests wait for its principal
+        with self.lock:
+            current = self.loads.get(user_id)
+            if current is None:
+                current = self.loads[user_id] = Load()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            current.done.wait(current_app.config.get("PRINCIPAL_CACHE_WAIT", 5))
+            return current.principal or self.load(user_id, load)
+
+        try:
+            current.principal = self.load(user_id, load)
+        finally:
+            with self.lock:
+                del self.loads[user_id]
+            current.done.set()
+
+        return current.principal
+
+    def load(self, user_id, load):
+        # the version is read first: a change during the load is seen by the
+        # next request
+        version = cache.get(self.get_version_key(user_id))
+        principal = cache.get(self.get_key(user_id))
+        if principal is None:
+            principal = load(user_id)
+            if principal is None:
+                return None
+            cache.set(self.get_key(user_id), principal)
+
+        self.set_local(principal, version)
+        return principal
+
+    def set_version(self, user_id):
+        # evicts the entries of all the processes
+        version = uuid4().hex[:8]
+        cache.set(self.get_version_key(user_id), version)
+        return version
+
+    def set(self, principal):
+        cache.set(self.get_key(principal.user_id), principal)
+        self.set_local(principal, self.set_version(principal.user_id))
+
+    def delete(self, user_id):
+        cache.delete(self.get_key(user_id))
+        self.set_version(user_id)
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+
+principals = PrincipalCache()
@@ -6,7 +6,7 @@ from flask_login import current_user, login_required, login_user, logout_user
 from sqlalchemy.exc import IntegrityError
 from werkzeug.routing import BuildError
 
-from flask_list import cache, database, login
+from flask_list import database, login
 from flask_list.auth import blueprint
 from flask_list.auth.emails import (
     send_invite_email,
@@ -21,6 +21,7 @@ from flask_list.auth.forms import (
     ResetPasswordConfirmationForm,
     ResetPasswordForm,
 )
+from flask_list.auth.principals import principals
 from flask_list.models import User
 
 
@@ -29,15 +30,14 @@ def unauthorized_user():
     return redirect(url_for("auth.login", next=request.endpoint))
 
 
+def get_principal(user_id):
+    user = database.session.get(User, user_id)
+    return user.get_principal() if user is not None else None
+
+
 @login.user_loader
 def load_user(user_id):
-    key = f"user_{user_id}"
-    user = cache.get(key)
-    if user is None:
-        user = User.query.get(int(user_id))
-        cache.set(key, user)
-
-    return user
+    return principals.get(int(user_id), get_principal)
 
 
 # cli command: flask auth cleaning
@@ -94,6 +94,7 @@ def register_confirmation(token):
 
     user.active = True
     database.session.commit()
+    principals.set(user.get_principal())
 
     flash("The registration is successful!")
     return redirect(url_for("auth.login"))
@@ -163,7 +164,7 @@ def login():
 @blueprint.route("/logout")
 @login_required
 def logout():
-    cache.delete(f"user_{current_user.user_id}")
+    principals.delete(current_user.user_id)
     logout_user()
     return redirect(url_for("index"))
 
@@ -173,7 +174,9 @@ def logout():
 def change_password():
     form = ChangePasswordForm()
     if form.validate_on_submit():
-        if form.version_id.data != current_user.version_id:
+        # the cached principal has no password hash
+        user = database.session.get(User, current_user.user_id)
+        if user is None or form.version_id.data != str(user.version_id):
             flash(
                 "The password has not been saved due to concurrent modification.",
                 "error",
@@ -189,11 +192,10 @@ def change_password():
             and form.password.data == form.password_conf.data
         ):
             # check if the current password is valid
-            if current_user.verify_password(form.password_curr.data):
-                user = User.query.get(current_user.user_id)
+            if user.verify_password(form.password_curr.data):
                 user.set_password(form.password.data)
                 database.session.commit()
-                cache.delete(f"user_{current_user.user_id}")
+                principals.set(user.get_principal())
                 flash("The password has been changed.")
             else:
                 flash("The current password is invalid.", "error")
@@ -255,6 +257,8 @@ def reset_password_confirmation(token):
         ):
             user.set_password(form.password.data)
             database.session.commit()
+            # the cached principal has the previous version
+            principals.set(user.get_principal())
             flash("Your password has been reset.")
 
         return redirect(url_for("auth.login"))
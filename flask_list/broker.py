@@ -0,0 +1,72 @@
+from collections import defaultdict
+from queue import Empty, Full, Queue
+from threading import Lock
+
+from flask import current_app
+from werkzeug.utils import import_string
+
+
+class LocalBackend:
+    # in process backend: the subscribers only receive the messages published
+    # by the same process, another backend has to implement the same methods
+    # to reach the subscribers of the other processes
+
+    def __init__(self, application):
+        self.queue_size = application.config.get("BROKER_QUEUE_SIZE", 1000)
+        self.lock = Lock()
+        self.subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = Queue(self.queue_size)
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, channel, subscription):
+        with self.lock:
+            self.subscriptions[channel].discard(subscription)
+            if not self.subscriptions[channel]:
+                del self.subscriptions[channel]
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait(message)
+            except Full:
+                # a slow subscriber loses messages, it has to sync again
+                pass
+
+    def listen(self, subscription, timeout):
+        try:
+            return subscription.get(timeout=timeout)
+        except Empty:
+            return None
+
+
+class Broker:
+    def __init__(self, application=None):
+        if application is not None:
+            self.init_app(application)
+
+    def init_app(self, application):
+        backend = application.config.get(
+            "BROKER_BACKEND", "flask_list.broker.LocalBackend"
+        )
+        application.extensions["broker"] = import_string(backend)(application)
+
+    @property
+    def backend(self):
+        return current_app.extensions["broker"]
+
+    def subscribe(self, channel):
+        return self.backend.subscribe(channel)
+
+    def unsubscribe(self, channel, subscription):
+        self.backend.unsubscribe(channel, subscription)
+
+    def publish(self, channel, message):
+        self.backend.publish(channel, message)
@@ -0,0 +1,92 @@
+from time import monotonic
+
+from flask import current_app, g, has_request_context, jsonify, render_template, request
+from sqlalchemy import event
+
+
+class QueryBudgetExceeded(Exception):
+    # a query interrupted by the progress handler, the other operational errors
+    # keep their handling (retries, 500)
+
+    def __init__(self, statement):
+        super().__init__(statement)
+        self.statement = statement
+
+
+def check_deadline(deadline):
+    # called by sqlite every few virtual machine instructions, a true value
+    # interrupts the query
+    def handler():
+        if monotonic() < deadline:
+            return 0
+        g.database_budget_exceeded = True
+        return 1
+
+    return handler
+
+
+class QueryBudget:
+    # a request runs its queries for DATABASE_REQUEST_BUDGET seconds at most, a
+    # runaway query is interrupted instead of holding a worker and a read
+    # transaction; always wired by the factory, the budget is read on each
+    # request
+
+    def __init__(self, application=None):
+        if application is not None:
+            self.init_app(application)
+
+    def init_app(self, application):
+        with application.app_context():
+            for engine in application.extensions["sqlalchemy"].engines.values():
+                if engine.dialect.name != "sqlite":
+                    continue
+
+                event.listen(engine, "checkout", self.set_handler)
+                event.listen(engine, "checkin", self.remove_handler)
+                event.listen(engine, "handle_error", self.translate_error)
+
+        application.before_request(self.start_request)
+        application.register_error_handler(QueryBudgetExceeded, self.handle_error)
+
+    def start_request(self):
+        budget = current_app.config.get("DATABASE_REQUEST_BUDGET")
+        g.database_deadline = monotonic() + budget if budget is not None else None
+
+    def set_handler(self, dbapi_connection, connection_record, connection_proxy):
+        # the queries of the cli commands and of the background threads have no
+        # budget
+        deadline = g.get("database_deadline") if has_request_context() else None
+        if deadline is not None:
+            dbapi_connection.set_progress_handler(
+                check_deadline(deadline),
+                current_app.config.get("DATABASE_BUDGET_STEPS", 1000),
+            )
+
+    def remove_handler(self, dbapi_connection, connection_record):
+        dbapi_connection.set_progress_handler(None, 0)
+
+    def translate_error(self, context):
+        # raised instead of the interrupted operational error
+        if has_request_context() and g.pop("database_budget_exceeded", False):
+            return QueryBudgetExceeded(context.statement)
+
+    def handle_error(self, error):
+        # the connection is given back without its handler, the error page can
+        # load the user
+        g.database_deadline = None
+        current_app.extensions["sqlalchemy"].session.rollback()
+        current_app.logger.warning(
+            f"request: {request.method} {request.endpoint} database budget of"
+            f" {current_app.config.get('DATABASE_REQUEST_BUDGET')}s exceeded:"
+            f" {' '.join((error.statement or '').split())}"
+        )
+
+        if request.is_json:
+            response = jsonify({"status": "database time budget exceeded"})
+        else:
+            response = current_app.make_response(
+                render_template("error/503.html.jinja")
+            )
+        response.status_code = 503
+        response.headers["Retry-After"] = "5"
+        return response
@@ -19,8 +19,11 @@ class CreateForm(FlaskForm):
         self.list_id = list_id
 
     def validate_name(self, name):
+        # the name of a category being deleted is free
         category = Category.query.filter(
-            Category.list_id == self.list_id, Category.name == name.data
+            Category.list_id == self.list_id,
+            Category.name == name.data,
+            Category.deleting == False,  # noqa: E712
         ).first()
 
         if category is not None:
@@ -45,7 +48,9 @@ class UpdateForm(FlaskForm):
     def validate_name(self, name):
         if name.data != self.original_name:
             category = Category.query.filter(
-                Category.list_id == self.list_id, Category.name == name.data
+                Category.list_id == self.list_id,
+                Category.name == name.data,
+                Category.deleting == False,  # noqa: E712
             ).first()
 
             if category is not None:
@@ -1,17 +1,19 @@
-from flask import flash, redirect, render_template, request, url_for
+from flask import current_app, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import func, literal_column
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import StaleDataError
 
 from flask_list import database
 from flask_list.category import blueprint
 from flask_list.category.forms import CreateForm, DeleteForm, UpdateForm
-from flask_list.models import Category, Item, List
+from flask_list.list.deletion import background_deleter
+from flask_list.models import Category, List, log_changes, touch_lists
+from flask_list.retry import retry_on_busy
 
 
 @blueprint.route("/create/<int:list_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def create(list_id):
     list_ = List.query.get(list_id)
     if list_ is None or not current_user.has_access(list_):
@@ -44,9 +46,14 @@ def create(list_id):
 
 @blueprint.route("/update/<int:category_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def update(category_id):
     category = Category.query.get(category_id)
-    if category is None or not current_user.has_access(category.list_):
+    if (
+        category is None
+        or category.deleting
+        or not current_user.has_access(category.list_)
+    ):
         flash("The category has not been found.", "error")
         return redirect(url_for("list.read"))
     list_id = category.list_id
@@ -54,7 +61,7 @@ def update(category_id):
     form = UpdateForm(category.list_id, category.name)
     if form.validate_on_submit():
         try:
-            if category.version_id != form.version_id.data:
+            if str(category.version_id) != form.version_id.data:
                 raise StaleDataError()
 
             category.name = form.name.data
@@ -82,9 +89,14 @@ def update(category_id):
 
 @blueprint.route("/delete/<int:category_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def delete(category_id):
     category = Category.query.get(category_id)
-    if category is None or not current_user.has_access(category.list_):
+    if (
+        category is None
+        or category.deleting
+        or not current_user.has_access(category.list_)
+    ):
         flash("The category has not been found.", "error")
         return redirect(url_for("list.read"))
     list_id = category.list_id
@@ -92,18 +104,33 @@ def delete(category_id):
     form = DeleteForm()
     if form.validate_on_submit():
         try:
-            if category.version_id != form.version_id.data:
+            if str(category.version_id) != form.version_id.data:
                 raise StaleDataError()
 
-            database.session.query(Item).filter(Item.category_id == category_id).delete(
-                synchronize_session=False
-            )
-
+            # hidden at once, its items are deleted in chunks in the background
+            item_count = category.item_count
             database.session.query(Category).filter(
                 Category.category_id == category_id
-            ).delete(synchronize_session=False)
+            ).update({"deleting": True}, synchronize_session=False)
+
+            # the bulk update doesn't go through the flush
+            log_changes(
+                database.session,
+                [
+                    {
+                        "list_id": list_id,
+                        "entity": "category",
+                        "entity_id": category_id,
+                        "operation": "delete",
+                        "fields": {},
+                    }
+                ],
+            )
+            touch_lists(database.session, deltas={list_id: (-1, -item_count)})
 
             database.session.commit()
+            if current_app.config.get("DELETION_BACKGROUND", True):
+                background_deleter.notify(current_app._get_current_object())
             flash("The category has been deleted.")
         except StaleDataError:
             database.session.rollback()
@@ -117,16 +144,10 @@ def delete(category_id):
         form.name.data = category.name
         form.version_id.data = category.version_id
 
-    item_count = (
-        database.session.query(func.count(literal_column("*")))
-        .filter(Item.category_id == category_id)
-        .scalar()
-    )
-
     return render_template(
         "category/delete.html.jinja",
         title="Delete Category",
         form=form,
-        item_count=item_count,
+        item_count=category.item_count,
         cancel_url=url_for("list.detail", list_id=list_id),
     )
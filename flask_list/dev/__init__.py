@@ -0,0 +1,6 @@
+from flask import Blueprint
+
+# development commands only, no routes
+blueprint = Blueprint("dev", __name__)
+
+from flask_list.dev import benchmark, replay, seed  # noqa: E402, F401
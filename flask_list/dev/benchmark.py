@@ -0,0 +1,188 @@
+import json
+import platform
+import random
+import sqlite3
+from datetime import datetime
+from time import perf_counter
+from uuid import uuid4
+
+import click
+from flask import current_app
+
+from flask_list import database
+from flask_list.dev import blueprint
+from flask_list.dev.seed import (
+    SEED_PASSWORD,
+    check_scratch_database,
+    create_list,
+    create_users,
+)
+from flask_list.models import Category, Item, ItemType, List, User
+
+BASE_URL = "https://localhost"
+CATEGORY_COUNT = 10
+
+
+def get_statistics(durations):
+    durations = sorted(durations)
+
+    def get_percentile(percentile):
+        return durations[min(len(durations) - 1, int(len(durations) * percentile))]
+
+    return {
+        "count": len(durations),
+        "min": durations[0] * 1000,
+        "median": get_percentile(0.5) * 1000,
+        "p95": get_percentile(0.95) * 1000,
+        "p99": get_percentile(0.99) * 1000,
+        "max": durations[-1] * 1000,
+        "mean": sum(durations) / len(durations) * 1000,
+    }
+
+
+def measure(request, repeat):
+    durations = []
+    for index in range(repeat):
+        started_on = perf_counter()
+        response = request(index)
+        response.get_data()  # the streamed responses are rendered here
+        # the requests share the application context of the command, the session
+        # is removed as at the end of a request
+        database.session.remove()
+        durations.append(perf_counter() - started_on)
+        if response.status_code >= 400 or (
+            response.is_json and response.json["status"] != "ok"
+        ):
+            raise click.ClickException(
+                f"{response.status_code} {response.get_data(as_text=True)[:200]}"
+            )
+
+    return durations
+
+
+def set_item(client, endpoint, item, **data):
+    response = client.post(
+        f"{BASE_URL}/item/{endpoint}",
+        json={"item_id": item["item_id"], "version_id": item["version_id"], **data},
+    )
+    if response.is_json and "version" in response.json:
+        item["version_id"] = response.json["version"]
+
+    return response
+
+
+def get_item(list_id, type_):
+    item = Item.query.filter(Item.list_id == list_id, Item.type_ == type_).first()
+
+    return {"item_id": item.item_id, "version_id": item.version_id}
+
+
+def run_benchmarks(client, generator, user_id, run, size, repeat):
+    list_id = create_list(
+        generator, user_id, run, CATEGORY_COUNT, max(1, size // CATEGORY_COUNT), True
+    ).list_id
+    selection = get_item(list_id, ItemType.selection)
+    number = get_item(list_id, ItemType.number)
+    text = get_item(list_id, ItemType.text)
+
+    # the first run of the details renders the tables of the categories, the
+    # next ones read them from the cache
+    benchmarks = {
+        "list.detail": lambda index: client.get(f"{BASE_URL}/list/detail/{list_id}"),
+        "list.read": lambda index: client.get(f"{BASE_URL}/list/read"),
+        "item.switch_selection": lambda index: set_item(
+            client, "switch_selection", selection
+        ),
+        "item.set_number": lambda index: set_item(
+            client, "set_number", number, number=str(index)
+        ),
+        "item.set_text": lambda index: set_item(
+            client, "set_text", text, text=f"text {index}"
+        ),
+    }
+    results = {name: measure(request, repeat) for name, request in benchmarks.items()}
+
+    # the cascades are measured once, the deleted data would have to be seeded
+    # again for each run
+    category_id, version_id = (
+        database.session.query(Category.category_id, Category.version_id)
+        .filter(Category.list_id == list_id)
+        .first()
+    )
+    results["category.delete"] = measure(
+        lambda index: client.post(
+            f"{BASE_URL}/category/delete/{category_id}",
+            data={"version_id": version_id},
+        ),
+        1,
+    )
+    version_id = database.session.get(List, list_id).version_id
+    results["list.delete"] = measure(
+        lambda index: client.post(
+            f"{BASE_URL}/list/delete/{list_id}", data={"version_id": version_id}
+        ),
+        1,
+    )
+
+    return results
+
+
+# cli command: flask dev benchmark
+@blueprint.cli.command("benchmark")
+@click.option(
+    "--sizes", default="100,1000,10000", help="Numbers of items of the lists (>= 10)."
+)
+@click.option("--repeat", default=20, help="Number of runs of each request.")
+@click.option("--seed", default=0, help="Seed of the random generator.")
+@click.option("--output", default="-", type=click.File("w"), help="JSON results.")
+def benchmark(sizes, repeat, seed, output):
+    check_scratch_database()
+    generator = random.Random(seed)
+    run = uuid4().hex[:8]
+
+    # the forms are posted by the test client without their tokens
+    current_app.config["WTF_CSRF_ENABLED"] = False
+
+    (user,) = create_users(1, run)
+    user_id, email = user.user_id, user.email
+    client = current_app.test_client()
+
+    results = []
+    try:
+        response = client.post(
+            f"{BASE_URL}/auth/login", data={"email": email, "password": SEED_PASSWORD}
+        )
+        database.session.remove()
+        if response.status_code != 302:
+            raise click.ClickException("the seeded user cannot log in")
+
+        for size in (int(size) for size in sizes.split(",")):
+            click.echo(f"size: {size}", err=True)
+            for name, durations in run_benchmarks(
+                client, generator, user_id, run, size, repeat
+            ).items():
+                statistics = get_statistics(durations)
+                results.append({"size": size, "name": name, **statistics})
+                click.echo(
+                    f"  {name}: median {statistics['median']:.2f} ms"
+                    f" p95 {statistics['p95']:.2f} ms",
+                    err=True,
+                )
+    finally:
+        database.session.rollback()
+        database.session.query(User).filter(User.user_id == user_id).delete()
+        database.session.commit()
+
+    json.dump(
+        {
+            "created_on": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "database": database.engine.url.render_as_string(hide_password=True),
+            "repeat": repeat,
+            "results": results,
+        },
+        output,
+        indent=2,
+    )
+    output.write("\n")
@@ -0,0 +1,384 @@
+import json
+import random
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter, sleep
+from uuid import uuid4
+
+import click
+from flask import current_app, got_request_exception, url_for
+from sqlalchemy import select
+
+from flask_list import database
+from flask_list.dev import blueprint
+from flask_list.dev.benchmark import BASE_URL, get_statistics
+from flask_list.dev.seed import (
+    SEED_PASSWORD,
+    check_scratch_database,
+    create_list,
+    create_users,
+)
+from flask_list.models import Category, Item, ItemType
+from flask_list.retry import is_busy, retry_counts
+
+CATEGORY_COUNT = 10
+# not replayed: the pages of the users and the endless event streams
+SKIPPED_ENDPOINTS = ("static", "list.events")
+# the type of the items mutated by the endpoints and the batch actions
+ITEM_TYPES = {
+    "switch_selection": ItemType.selection,
+    "set_number": ItemType.number,
+    "add_number": ItemType.number,
+    "set_text": ItemType.text,
+}
+VALUES = {"number": "1", "to_add": "1", "text": "replay"}
+
+
+class Replay:
+    # maps the pseudonyms of the trace to seeded lists, categories and items
+
+    def __init__(self, generator, run, item_count):
+        self.generator = generator
+        self.run = run
+        self.item_count = item_count
+        self.lists = {}
+        self.categories = {}
+        self.items = {}
+        self.free_categories = {}
+        self.free_items = {}
+        # the versions of the items are shared by the clients like in the
+        # database, a client sending an older version gets a conflict
+        self.versions = {}
+
+    def get_list(self, pseudonym, user_id):
+        if pseudonym not in self.lists:
+            list_ = create_list(
+                self.generator,
+                user_id,
+                self.run,
+                CATEGORY_COUNT,
+                max(1, self.item_count // CATEGORY_COUNT),
+                True,
+            )
+            list_.private = False  # shared by the clients of the trace
+            database.session.commit()
+            list_id = list_.list_id
+
+            self.free_categories[list_id] = database.session.scalars(
+                select(Category.category_id).where(Category.list_id == list_id)
+            ).all()
+            self.free_items[list_id] = defaultdict(list)
+            for item_id, type_, version_id in database.session.execute(
+                select(Item.item_id, Item.type_, Item.version_id).where(
+                    Item.list_id == list_id
+                )
+            ):
+                self.free_items[list_id][type_].append(item_id)
+                self.free_items[list_id][None].append(item_id)
+                self.versions[item_id] = version_id
+            for item_ids in self.free_items[list_id].values():
+                self.generator.shuffle(item_ids)
+            self.lists[pseudonym] = list_id
+
+        return self.lists[pseudonym]
+
+    def get_category(self, pseudonym, list_id):
+        if pseudonym not in self.categories:
+            free = self.free_categories[list_id]
+            self.categories[pseudonym] = (
+                free.pop() if len(free) > 1 else self.generator.choice(free)
+            )
+
+        return self.categories[pseudonym]
+
+    def get_item(self, pseudonym, list_id, type_):
+        if pseudonym not in self.items:
+            free = self.free_items[list_id][type_] or self.free_items[list_id][None]
+            self.items[pseudonym] = free.pop() if len(free) > 1 else free[0]
+
+        return self.items[pseudonym]
+
+    def get_payload(self, shape, list_id, type_=None, key=None):
+        if isinstance(shape, list):
+            return [self.get_payload(value, list_id, type_, key) for value in shape]
+        if isinstance(shape, dict):
+            type_ = ITEM_TYPES.get(shape.get("action"), type_)
+            return {
+                key: self.get_payload(value, list_id, type_, key)
+                for key, value in shape.items()
+            }
+        if key == "item_id":
+            return self.get_item(shape, list_id, type_)
+        if key == "category_id":
+            return self.get_category(shape, list_id)
+        if key == "list_id":
+            return list_id
+        if key == "action":
+            return shape
+
+        return {"int": 0, "float": 0.0, "bool": True, "NoneType": None}.get(
+            shape, VALUES.get(key, "replay")
+        )
+
+
+def get_versions(payload, versions):
+    # the versions are read when the request is sent
+    if isinstance(payload, list):
+        return [get_versions(value, versions) for value in payload]
+    if isinstance(payload, dict):
+        payload = {key: get_versions(value, versions) for key, value in payload.items()}
+        if "item_id" in payload and "version_id" in payload:
+            payload["version_id"] = versions.get(payload["item_id"])
+
+    return payload
+
+
+def get_item_ids(payload):
+    if isinstance(payload, list):
+        return [item_id for value in payload for item_id in get_item_ids(value)]
+    if isinstance(payload, dict):
+        return [
+            item_id
+            for key, value in payload.items()
+            for item_id in ([value] if key == "item_id" else get_item_ids(value))
+        ]
+
+    return []
+
+
+def load_requests(traces, replay, skipped):
+    # each client of the trace gets a user and sends its requests in order
+    replayed = []
+    for trace in traces:
+        endpoint = trace.get("endpoint")
+        if (
+            not endpoint
+            or endpoint in SKIPPED_ENDPOINTS
+            or endpoint.startswith("auth.")
+            or trace["method"] != "GET"
+            and trace.get("payload") in (None, "invalid")  # the forms
+        ):
+            skipped[endpoint or "unknown"] += 1
+        else:
+            replayed.append(trace)
+    traces = replayed
+    if not traces:
+        return {}
+
+    clients = {trace["client"]: None for trace in traces}
+    users = create_users(len(clients), replay.run)
+    clients = {
+        client: {"user_id": user.user_id, "email": user.email, "requests": []}
+        for client, user in zip(clients, users)
+    }
+
+    started_on = traces[0]["time"]
+    for trace in traces:
+        client = clients[trace["client"]]
+        arguments = trace.get("arguments") or {}
+        # the categories and items are taken in the last list read by the client
+        if "list_id" in arguments:
+            client["list_id"] = replay.get_list(arguments["list_id"], client["user_id"])
+        elif "list_id" not in client:
+            client["list_id"] = replay.get_list(client["email"], client["user_id"])
+
+        endpoint = trace["endpoint"]
+        url = url_for(
+            endpoint,
+            **replay.get_payload(
+                arguments, client["list_id"], ITEM_TYPES.get(endpoint.split(".")[-1])
+            ),
+            **{key: "0" for key in trace.get("query", [])},
+        )
+        payload = (
+            replay.get_payload(
+                trace["payload"],
+                client["list_id"],
+                ITEM_TYPES.get(endpoint.split(".")[-1]),
+            )
+            if trace["method"] != "GET"
+            else None
+        )
+        client["requests"].append(
+            (trace["time"] - started_on, trace["method"], endpoint, url, payload)
+        )
+
+    return clients
+
+
+# cli command: flask dev replay
+@blueprint.cli.command("replay")
+@click.argument("trace", type=click.File("r"))
+@click.option("--threads", default=8, help="Number of concurrent clients.")
+@click.option("--speed", default=1.0, help="Speed of the trace, 0 for no pauses.")
+@click.option("--items", default=200, help="Number of items of the seeded lists.")
+@click.option("--seed", default=0, help="Seed of the random generator.")
+@click.option("--output", default=None, type=click.File("w"), help="JSON results.")
+def replay(trace, threads, speed, items, seed, output):
+    check_scratch_database()
+    application = current_app._get_current_object()
+    skipped = Counter()
+    traces = sorted(
+        (json.loads(line) for line in trace if line.strip()), key=lambda t: t["time"]
+    )
+
+    # the forms and the json requests are sent by the test client without their
+    # tokens
+    application.config["WTF_CSRF_ENABLED"] = False
+
+    replay = Replay(random.Random(seed), uuid4().hex[:8], items)
+    with application.test_request_context(base_url=BASE_URL):
+        clients = load_requests(traces, replay, skipped)
+        lists_url = url_for("list.read")
+    database.session.remove()
+    if not clients:
+        raise click.ClickException("no request to replay")
+
+    lock = Lock()
+    durations = defaultdict(list)
+    statuses = Counter()
+    stale_counts = Counter()
+    exceptions = Counter()
+
+    def count_exception(sender, exception, **extra):
+        with lock:
+            if is_busy(exception):
+                exceptions["locked"] += 1
+            else:
+                exceptions[type(exception).__name__] += 1
+
+    def run_client(client, started_on):
+        http = application.test_client()
+        response = http.post(
+            f"{BASE_URL}/auth/login",
+            data={"email": client["email"], "password": SEED_PASSWORD},
+        )
+        if response.status_code != 302:
+            raise click.ClickException("a seeded user cannot log in")
+
+        for offset, method, endpoint, url, payload in client["requests"]:
+            if speed > 0:
+                sleep(max(0, started_on + offset / speed - perf_counter()))
+
+            request_started_on = perf_counter()
+            if method == "GET":
+                response = http.get(f"{BASE_URL}{url}")
+            else:
+                response = http.open(
+                    f"{BASE_URL}{url}",
+                    method=method,
+                    json=get_versions(payload, replay.versions),
+                )
+            response.get_data()
+            duration = perf_counter() - request_started_on
+
+            status = str(response.status_code)
+            stale_count = 0
+            if response.is_json:
+                data = response.json
+                status = data.get("status", status)
+                results = data.get("results") or [
+                    {"item_id": (payload or {}).get("item_id"), **data}
+                ]
+                for result in results:
+                    if "version" in result and result.get("item_id") is not None:
+                        replay.versions[result["item_id"]] = result["version"]
+                # the item views catch the stale data errors: a single item is
+                # cancelled to its list (to the lists when it's gone), a batch
+                # reports it per item
+                if "results" in data:
+                    stale_count = sum(
+                        result.get("status") == "stale" for result in data["results"]
+                    )
+                else:
+                    stale_count = int(
+                        endpoint.startswith("item.")
+                        and status == "cancel"
+                        and data.get("cancel_url") != lists_url
+                    )
+                if status == "cancel":
+                    # the client reloads the list on a conflict
+                    with application.app_context():
+                        for item_id in get_item_ids(payload):
+                            item = database.session.get(Item, item_id)
+                            if item is not None:
+                                replay.versions[item_id] = item.version_id
+
+            with lock:
+                durations[endpoint].append(duration)
+                statuses[status] += 1
+                stale_counts[endpoint] += stale_count
+
+    retried_on = retry_counts.get()
+    got_request_exception.connect(count_exception, application)
+    try:
+        started_on = perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            for future in [
+                executor.submit(run_client, client, started_on)
+                for client in clients.values()
+            ]:
+                future.result()
+        duration = perf_counter() - started_on
+    finally:
+        got_request_exception.disconnect(count_exception, application)
+
+    retries = Counter()
+    for (endpoint, name), value in retry_counts.get().items():
+        retries[name] += value - retried_on.get((endpoint, name), 0)
+
+    count = sum(statuses.values())
+    results = {
+        "trace": trace.name,
+        "clients": len(clients),
+        "threads": threads,
+        "speed": speed,
+        "requests": count,
+        "duration": duration,
+        "throughput": count / duration,
+        "latency": get_statistics(
+            [duration for values in durations.values() for duration in values]
+        ),
+        "endpoints": {
+            endpoint: get_statistics(values)
+            for endpoint, values in sorted(durations.items())
+        },
+        "statuses": dict(statuses),
+        "conflict_rate": statuses["cancel"] / count,
+        "stale_rate": sum(stale_counts.values()) / count,
+        "locked_rate": exceptions["locked"] / count,
+        "retries": dict(retries),
+        "exceptions": dict(exceptions),
+        "skipped": dict(skipped),
+    }
+
+    click.echo(
+        f"{count} requests of {len(clients)} clients in {duration:.2f} s:"
+        f" {results['throughput']:.1f} requests/s"
+    )
+    latency = results["latency"]
+    click.echo(
+        f"latency: median {latency['median']:.2f} ms p95 {latency['p95']:.2f} ms"
+        f" p99 {latency['p99']:.2f} ms"
+    )
+    for endpoint, statistics in results["endpoints"].items():
+        click.echo(
+            f"  {endpoint}: {statistics['count']} median {statistics['median']:.2f} ms"
+            f" p95 {statistics['p95']:.2f} ms"
+        )
+    click.echo(
+        f"conflicts: {results['conflict_rate']:.2%}"
+        f" stale data errors: {results['stale_rate']:.2%}"
+        f" database locked: {results['locked_rate']:.2%}"
+    )
+    click.echo(
+        f"retries: {retries['retried']} recovered: {retries['recovered']}"
+        f" exhausted: {retries['exhausted']}"
+    )
+    if skipped:
+        click.echo(f"skipped: {sum(skipped.values())} ({dict(skipped)})")
+
+    if output:
+        json.dump(results, output, indent=2)
+        output.write("\n")
@@ -0,0 +1,209 @@
+import random
+from decimal import Decimal
+from uuid import uuid4
+
+import click
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+from flask_list import database
+from flask_list.dev import blueprint
+from flask_list.models import Category, Item, ItemType, List, User
+
+SEED_PASSWORD = "password"
+
+LIST_WORDS = (
+    "groceries",
+    "holidays",
+    "house",
+    "garden",
+    "party",
+    "books",
+    "movies",
+    "gifts",
+    "work",
+    "moving",
+    "camping",
+    "recipes",
+)
+CATEGORY_WORDS = (
+    "fruits",
+    "vegetables",
+    "dairy",
+    "bakery",
+    "drinks",
+    "cleaning",
+    "tools",
+    "clothes",
+    "kitchen",
+    "bathroom",
+    "documents",
+    "electronics",
+    "toys",
+    "pharmacy",
+    "frozen",
+    "snacks",
+)
+ITEM_WORDS = (
+    "apples",
+    "bread",
+    "milk",
+    "eggs",
+    "butter",
+    "cheese",
+    "coffee",
+    "tea",
+    "rice",
+    "pasta",
+    "tomatoes",
+    "potatoes",
+    "onions",
+    "carrots",
+    "bananas",
+    "oranges",
+    "water",
+    "juice",
+    "soap",
+    "towels",
+    "batteries",
+    "charger",
+    "passport",
+    "tickets",
+    "sunscreen",
+    "tent",
+    "lamp",
+    "rope",
+    "hammer",
+    "nails",
+    "paint",
+    "brush",
+)
+# selections are the most frequent items, then numbers
+ITEM_TYPES = (ItemType.selection, ItemType.number, ItemType.text)
+ITEM_TYPE_WEIGHTS = (6, 3, 1)
+
+
+def check_scratch_database():
+    # the commands write into the database of the instance: it must be marked
+    # as a scratch database, never the production one
+    if not current_app.config.get("DEV_SCRATCH_DATABASE", False):
+        raise click.ClickException(
+            "the database of the instance is not a scratch database, set"
+            " DEV_SCRATCH_DATABASE = True in the configuration of a scratch instance"
+        )
+
+
+def get_weights(words):
+    # zipf distribution: a few names are much more frequent than the others
+    return [1 / rank for rank in range(1, len(words) + 1)]
+
+
+def get_name(generator, words, used):
+    name = generator.choices(words, weights=get_weights(words))[0]
+    # the names are unique in their scope, the frequent ones are numbered
+    if name in used:
+        name = f"{name} {len(used) + 1}"
+    used.add(name)
+
+    return name
+
+
+def get_size(generator, mean):
+    # skewed sizes: many small lists and a few very large ones
+    return max(1, round(generator.lognormvariate(0, 0.75) * mean / 1.3))
+
+
+def create_users(count, run):
+    password_hash = generate_password_hash(SEED_PASSWORD)
+    users = [
+        User(email=f"seed-{run}-{index}@example.com", active=True)
+        for index in range(count)
+    ]
+    for user in users:
+        user.password_hash = password_hash  # hashed once, it is slow on purpose
+    database.session.add_all(users)
+    database.session.commit()
+
+    return users
+
+
+def create_list(generator, user_id, run, category_count, item_count, sized=False):
+    # sized: exactly category_count categories, item_count items per category and
+    # the item types in the proportions of their weights
+    types = [
+        type_
+        for type_, weight in zip(ITEM_TYPES, ITEM_TYPE_WEIGHTS)
+        for _ in range(weight)
+    ]
+    list_ = List(
+        name=f"{get_name(generator, LIST_WORDS, set())} {run} {uuid4().hex[:8]}",
+        created_by=user_id,
+        private=generator.random() < 0.3,
+    )
+    database.session.add(list_)
+
+    category_names = set()
+    for _ in range(category_count if sized else get_size(generator, category_count)):
+        category = Category(
+            name=get_name(generator, CATEGORY_WORDS, category_names), list_=list_
+        )
+        database.session.add(category)
+        # the list of the items is set at the flush from their category id
+        database.session.flush()
+
+        item_names = set()
+        for index in range(item_count if sized else get_size(generator, item_count)):
+            type_ = (
+                types[(len(category_names) * item_count + index) % len(types)]
+                if sized
+                else generator.choices(ITEM_TYPES, weights=ITEM_TYPE_WEIGHTS)[0]
+            )
+            database.session.add(
+                Item(
+                    name=get_name(generator, ITEM_WORDS, item_names),
+                    type_=type_,
+                    selection=type_ == ItemType.selection and generator.random() < 0.4,
+                    number=(
+                        Decimal(generator.randint(0, 100000)) / 100
+                        if type_ == ItemType.number
+                        else Decimal(0)
+                    ),
+                    text=(
+                        " ".join(
+                            generator.choices(ITEM_WORDS, k=generator.randint(1, 8))
+                        )
+                        if type_ == ItemType.text
+                        else ""
+                    ),
+                    category_id=category.category_id,
+                )
+            )
+
+    database.session.commit()
+
+    return list_
+
+
+# cli command: flask dev seed
+@blueprint.cli.command("seed")
+@click.option("--users", default=10, help="Number of users.")
+@click.option("--lists", default=5, help="Mean number of lists per user.")
+@click.option("--categories", default=8, help="Mean number of categories per list.")
+@click.option("--items", default=15, help="Mean number of items per category.")
+@click.option("--seed", default=None, type=int, help="Seed of the random generator.")
+def seed(users, lists, categories, items, seed):
+    check_scratch_database()
+    generator = random.Random(seed)
+    run = uuid4().hex[:8]
+
+    list_count = item_count = 0
+    for user in create_users(users, run):
+        for _ in range(get_size(generator, lists)):
+            list_ = create_list(generator, user.user_id, run, categories, items)
+            list_count += 1
+            item_count += list_.item_count
+
+    click.echo(
+        f"{users} user(s), {list_count} list(s) and {item_count} item(s) created,"
+        f" users: seed-{run}-<n>@example.com password: {SEED_PASSWORD}"
+    )
@@ -0,0 +1,270 @@
+import re
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from flask_migrate.cli import db
+from sqlalchemy import delete, event, func, select, update
+
+from flask_list import database
+from flask_list.item.routes import get_items
+from flask_list.list.detail.routes import CHANGES_LIMIT, query_items
+from flask_list.list.routes import query_lists, query_lists_revision
+from flask_list.models import Category, Change, Item, List, User
+
+
+def get_chunk(model, condition):
+    # as deleted by delete_chunk
+    primary_key = model.__mapper__.primary_key[0]
+    return delete(model).where(
+        primary_key.in_(select(primary_key).where(condition).limit(1000))
+    )
+
+
+def get_statements(connection):
+    # the largest list gives the most representative plans
+    list_id, user_id = connection.execute(
+        select(List.list_id, List.created_by).order_by(List.item_count.desc()).limit(1)
+    ).first() or (0, 0)
+    category_ids = connection.scalars(
+        select(Category.category_id).where(Category.list_id == list_id)
+    ).all() or [0]
+    category_id = category_ids[0]
+    item_id = (
+        connection.scalar(select(Item.item_id).where(Item.list_id == list_id).limit(1))
+        or 0
+    )
+    now = datetime.utcnow()
+
+    return [
+        ("list.read: revision", query_lists_revision(user_id)),
+        ("list.read", query_lists(user_id).statement),
+        ("list.read_rows", query_lists(user_id, "", 0).statement),
+        (
+            "list.detail: categories",
+            Category.query.filter(
+                Category.list_id == list_id, Category.deleting == False  # noqa: E712
+            )
+            .order_by(Category.name)
+            .statement,
+        ),
+        ("list.detail: items", query_items(category_ids).statement),
+        (
+            "list.detail: since",
+            select(func.max(Change.change_id)).where(Change.list_id == list_id),
+        ),
+        (
+            "list.changes",
+            Change.query.filter(Change.list_id == list_id, Change.change_id > 0)
+            .order_by(Change.change_id)
+            .limit(CHANGES_LIMIT + 1)
+            .statement,
+        ),
+        ("item: access", get_items().filter(Item.item_id == item_id).statement),
+        (
+            "list: validate_name",
+            List.query.filter(List.name == "", List.deleting == False)  # noqa: E712
+            .limit(1)
+            .statement,
+        ),
+        (
+            "category: validate_name",
+            Category.query.filter(
+                Category.list_id == list_id,
+                Category.name == "",
+                Category.deleting == False,  # noqa: E712
+            )
+            .limit(1)
+            .statement,
+        ),
+        (
+            "item: validate_name",
+            Item.query.filter(Item.category_id == category_id, Item.name == "")
+            .limit(1)
+            .statement,
+        ),
+        (
+            "list.delete",
+            update(List).where(List.list_id == list_id).values(deleting=True),
+        ),
+        (
+            "category.delete",
+            update(Category)
+            .where(Category.category_id == category_id)
+            .values(deleting=True),
+        ),
+        (
+            "deletion: categories",
+            select(Category.category_id, Category.list_id).where(
+                Category.deleting == True  # noqa: E712
+            ),
+        ),
+        (
+            "deletion: lists",
+            select(List.list_id).where(List.deleting == True),  # noqa: E712
+        ),
+        (
+            "deletion: category items",
+            get_chunk(Item, Item.category_id == category_id),
+        ),
+        ("deletion: list items", get_chunk(Item, Item.list_id == list_id)),
+        (
+            "deletion: list categories",
+            get_chunk(Category, Category.list_id == list_id),
+        ),
+        ("deletion: list changes", get_chunk(Change, Change.list_id == list_id)),
+        (
+            "auth cleaning",
+            delete(User).where(
+                User.active == False, User.updated_on < now  # noqa: E712
+            ),
+        ),
+        ("list cleaning", delete(Change).where(Change.created_on < now)),
+    ]
+
+
+def explain(connection, statement):
+    plan = []
+
+    # the statement is compiled and bound as usual, only its plan is read
+    def prefix(connection, cursor, statement, parameters, context, executemany):
+        return f"EXPLAIN QUERY PLAN {statement}", parameters
+
+    def fetch(connection, cursor, statement, parameters, context, executemany):
+        plan.extend(cursor.fetchall())
+
+    event.listen(connection, "before_cursor_execute", prefix, retval=True)
+    event.listen(connection, "after_cursor_execute", fetch)
+    try:
+        connection.execute(statement).close()
+    finally:
+        event.remove(connection, "before_cursor_execute", prefix)
+        event.remove(connection, "after_cursor_execute", fetch)
+
+    return plan
+
+
+def get_warnings(detail, tables):
+    warnings = []
+
+    scan = re.match(r"SCAN (\w+)", detail)
+    if scan and scan.group(1) in tables:
+        warnings.append(
+            "full scan of an index" if "INDEX" in detail else "full scan of a table"
+        )
+    if "TEMP B-TREE" in detail:
+        warnings.append("temporary b-tree")
+    if "AUTOMATIC" in detail:
+        warnings.append("automatic index")
+
+    return warnings
+
+
+def get_indexes(connection):
+    indexes = {}
+
+    tables = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' "
+        "AND name NOT LIKE 'sqlite_%' AND name != 'alembic_version'"
+    ).scalars()
+    for table in tables:
+        rowid = tuple(
+            row[1]
+            for row in connection.exec_driver_sql(f'PRAGMA table_info("{table}")')
+            if row[5] and row[2].upper() == "INTEGER"
+        )
+        for row in connection.exec_driver_sql(f'PRAGMA index_list("{table}")'):
+            columns = tuple(
+                info[2]
+                for info in connection.exec_driver_sql(f'PRAGMA index_info("{row[1]}")')
+            )
+            indexes[row[1]] = {
+                "table": table,
+                "columns": columns,
+                "unique": bool(row[2]),
+                "partial": bool(row[4]),
+                "rowid": columns == rowid,
+            }
+
+    return indexes
+
+
+def get_redundancy(name, indexes):
+    index = indexes[name]
+    if index["rowid"]:
+        return "duplicates the integer primary key"
+
+    for other_name, other in indexes.items():
+        # a partial index doesn't cover the rows outside of its condition
+        if other_name == name or other["table"] != index["table"] or other["partial"]:
+            continue
+
+        if other["columns"] == index["columns"]:
+            # the unique index of a pair is kept, or the first one by name
+            if (other["unique"], name) > (index["unique"], other_name):
+                return f"duplicates {other_name}"
+        elif (
+            not index["unique"]
+            and other["columns"][: len(index["columns"])] == index["columns"]
+        ):
+            return f"is a prefix of {other_name}"
+
+
+# cli command: flask db index-report
+@db.command("index-report")
+@with_appcontext
+def index_report():
+    warning_count = 0
+
+    with database.engine.connect() as connection:
+        tables = set(
+            connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).scalars()
+        )
+        indexes = get_indexes(connection)
+        used = set()
+
+        for name, statement in get_statements(connection):
+            click.echo(name)
+
+            plan = explain(connection, statement)
+            depths = {0: 0}
+            for id_, parent, _, detail in plan:
+                depths[id_] = depths.get(parent, 0) + 1
+                used.update(re.findall(r"INDEX (\w+)", detail))
+
+                warnings = get_warnings(detail, tables)
+                warning_count += len(warnings)
+                click.echo(
+                    f"{'  ' * depths[id_]}{detail}"
+                    + "".join(f"  <- {warning}" for warning in warnings)
+                )
+
+        click.echo("indexes")
+        for name, index in sorted(indexes.items()):
+            columns = ", ".join(index["columns"])
+            notes = []
+
+            redundancy = get_redundancy(name, indexes)
+            if redundancy:
+                notes.append(redundancy)
+            # the lookups of the foreign key checks are not in the plans
+            if name not in used:
+                notes.append(
+                    "unused, kept for its unique constraint"
+                    if index["unique"]
+                    else "unused"
+                )
+
+            warning_count += bool(redundancy) + (
+                name not in used and not index["unique"]
+            )
+            click.echo(
+                f"  {name} ON {index['table']} ({columns})"
+                + "".join(f"  <- {note}" for note in notes)
+            )
+
+        connection.rollback()
+
+    click.echo(f"{warning_count} warning(s)")
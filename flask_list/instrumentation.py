@@ -0,0 +1,106 @@
+from collections import Counter
+from time import perf_counter
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class Statistics:
+    def __init__(self):
+        self.started_on = perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = (0.0, None)
+        self.statements = Counter()
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.slowest = max(self.slowest, (duration, statement), key=lambda s: s[0])
+        self.statements[statement] += 1
+
+    def get_repeated(self, threshold):
+        # the same select run again and again with other parameters, like the
+        # lazy loads of a relationship in a loop
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold and statement.lstrip().upper().startswith("SELECT")
+        ]
+
+
+def start_statement(connection, cursor, statement, parameters, context, executemany):
+    connection.info["statement_started_on"] = perf_counter()
+
+
+def end_statement(connection, cursor, statement, parameters, context, executemany):
+    started_on = connection.info.pop("statement_started_on", None)
+    statistics = g.get("sql_statistics") if has_app_context() else None
+    if started_on is not None and statistics is not None:
+        statistics.add(statement, perf_counter() - started_on)
+
+
+class Instrumentation:
+    def __init__(self, application=None):
+        if application is not None:
+            self.init_app(application)
+
+    def init_app(self, application):
+        self.server_timing = application.config.get("SQL_SERVER_TIMING", False)
+        self.slow_request = application.config.get("SQL_SLOW_REQUEST")
+        self.repeated_queries = application.config.get("SQL_REPEATED_QUERIES", 10)
+        if not self.server_timing and self.slow_request is None:
+            return
+
+        if not event.contains(Engine, "before_cursor_execute", start_statement):
+            event.listen(Engine, "before_cursor_execute", start_statement)
+            event.listen(Engine, "after_cursor_execute", end_statement)
+
+        application.before_request(self.start_request)
+        application.after_request(self.end_request)
+
+    def start_request(self):
+        g.sql_statistics = Statistics()
+
+    def end_request(self, response):
+        # the statements of a streamed response run after this point, they are
+        # not counted
+        statistics = g.pop("sql_statistics", None)
+        if statistics is None:
+            return response
+        duration = perf_counter() - statistics.started_on
+
+        if self.server_timing:
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={statistics.duration * 1000:.1f};desc="{statistics.count}'
+                f' queries"',
+            )
+            response.headers.add(
+                "Server-Timing", f"db-slowest;dur={statistics.slowest[0] * 1000:.1f}"
+            )
+            response.headers.add("Server-Timing", f"app;dur={duration * 1000:.1f}")
+            if "database_retries" in g:
+                response.headers.add(
+                    "Server-Timing", f'db-retry;desc="{g.database_retries} retries"'
+                )
+
+        repeated = statistics.get_repeated(self.repeated_queries)
+        if repeated or (
+            self.slow_request is not None and duration >= self.slow_request
+        ):
+            current_app.logger.warning(
+                f"request: {request.method} {request.endpoint}"
+                f" duration: {duration:.3f}s queries: {statistics.count}"
+                f" db: {statistics.duration:.3f}s"
+                f" slowest ({statistics.slowest[0]:.3f}s):"
+                f" {' '.join((statistics.slowest[1] or '').split())}"
+            )
+            for statement, count in repeated:
+                current_app.logger.warning(
+                    f"repeated query on {request.endpoint} ({count} times):"
+                    f" {' '.join(statement.split())}"
+                )
+
+        return response
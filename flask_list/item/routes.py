@@ -1,3 +1,4 @@
+from datetime import datetime
 from decimal import Decimal, DecimalException
 from traceback import format_exc
 
@@ -11,20 +12,56 @@ from flask import (
     url_for,
 )
 from flask_login import current_user, login_required
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import contains_eager
 from sqlalchemy.orm.exc import StaleDataError
 
 from flask_list import database
 from flask_list.item import blueprint
 from flask_list.item.forms import CreateForm, DeleteForm, UpdateForm
-from flask_list.models import Category, Item, ItemType
+from flask_list.item.writer import GroupWriter
+from flask_list.models import (
+    NUMBER_LIMIT,
+    NUMBER_SCALE,
+    Category,
+    Item,
+    ItemType,
+    log_changes,
+    touch_categories,
+    touch_lists,
+)
+from flask_list.retry import retry_on_busy
+
+MUTATIONS = ("switch_selection", "set_number", "set_text")
+
+
+def get_items():
+    # the items are read with their list in one query to check the access, the
+    # items of the categories being deleted are hidden
+    return (
+        Item.query.join(Item.list_)
+        .options(contains_eager(Item.list_))
+        .filter(
+            Item.category_id.not_in(
+                select(Category.category_id).where(
+                    Category.deleting == True  # noqa: E712
+                )
+            )
+        )
+    )
 
 
 @blueprint.route("/create/<int:category_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def create(category_id):
     category = Category.query.get(category_id)
-    if category is None or not current_user.has_access(category.list_):
+    if (
+        category is None
+        or category.deleting
+        or not current_user.has_access(category.list_)
+    ):
         flash("The category has not been found.", "error")
         return redirect(url_for("list.read"))
     list_id = category.list_id
@@ -32,16 +69,16 @@ def create(category_id):
     form = CreateForm()
     form.category_id.choices = [
         (c.category_id, c.name)
-        for c in Category.query.filter(Category.list_id == list_id).order_by(
-            Category.name
-        )
+        for c in Category.query.filter(
+            Category.list_id == list_id, Category.deleting == False  # noqa: E712
+        ).order_by(Category.name)
     ]
     form.type_.choices = [(type_.value, type_.name.title()) for type_ in ItemType]
     if form.validate_on_submit():
         try:
             item = Item(
                 name=form.name.data,
-                type_=ItemType(form.type_.data).name,
+                type_=ItemType(form.type_.data),
                 selection=False,
                 number=0,
                 text="",
@@ -72,29 +109,30 @@ def create(category_id):
 
 @blueprint.route("/update/<int:item_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def update(item_id):
-    item = Item.query.get(item_id)
-    if item is None or not current_user.has_access(item.category.list_):
+    item = get_items().filter(Item.item_id == item_id).one_or_none()
+    if item is None or not current_user.has_access(item.list_):
         flash("The item has not been found.", "error")
         return redirect(url_for("list.read"))
-    list_id = item.category.list_id
+    list_id = item.list_id
 
     form = UpdateForm(item.category_id, item.name)
     form.category_id.choices = [
         (c.category_id, c.name)
-        for c in Category.query.filter(Category.list_id == list_id).order_by(
-            Category.name
-        )
+        for c in Category.query.filter(
+            Category.list_id == list_id, Category.deleting == False  # noqa: E712
+        ).order_by(Category.name)
     ]
     form.type_.choices = [(type_.value, type_.name.title()) for type_ in ItemType]
     if form.validate_on_submit():
         try:
-            if item.version_id != form.version_id.data:
+            if str(item.version_id) != form.version_id.data:
                 raise StaleDataError()
 
             item.name = form.name.data
             item.category_id = form.category_id.data
-            item.type_ = ItemType(form.type_.data).name
+            item.type_ = ItemType(form.type_.data)
             database.session.commit()
             flash("The item has been updated.")
         except (IntegrityError, StaleDataError):
@@ -121,18 +159,19 @@ def update(item_id):
 
 @blueprint.route("/delete/<int:item_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def delete(item_id):
-    item = Item.query.get(item_id)
-    if item is None or not current_user.has_access(item.category.list_):
+    item = get_items().filter(Item.item_id == item_id).one_or_none()
+    if item is None or not current_user.has_access(item.list_):
         flash("The item has not been found.", "error")
         return redirect(url_for("list.read"))
-    list_id = item.category.list_id
+    list_id = item.list_id
 
     form = DeleteForm()
     form.type_.choices = [(type_.value, type_.name.title()) for type_ in ItemType]
     if form.validate_on_submit():
         try:
-            if item.version_id != form.version_id.data:
+            if str(item.version_id) != form.version_id.data:
                 raise StaleDataError()
 
             database.session.delete(item)
@@ -162,35 +201,43 @@ def delete(item_id):
 
 @blueprint.route("switch_selection", methods=["POST"])
 @login_required
+@retry_on_busy
 def switch_selection():
     try:
         data = request.get_json(False, True, False)
         item_id = int(data.get("item_id"))
-        version_id = data.get("version_id")
+        version_id = str(data.get("version_id"))
     except (AttributeError, TypeError, ValueError):
         current_app.logger.error(format_exc())
         current_app.logger.error(f"data: {data}")
         return jsonify({"status": "missing or invalid data"}), 400
 
-    item = Item.query.get(item_id)
-    if item is None or not current_user.has_access(item.category.list_):
+    if current_app.config.get("ITEM_GROUP_COMMIT", False):
+        return write_mutation(
+            {"action": "switch_selection", "item_id": item_id, "version_id": version_id}
+        )
+
+    item = get_items().filter(Item.item_id == item_id).one_or_none()
+    if item is None or not current_user.has_access(item.list_):
         flash("The item has not been found.", "error")
         return jsonify({"status": "cancel", "cancel_url": url_for("list.read")})
-    list_id = item.category.list_id
+    list_id = item.list_id
 
     try:
-        if item.version_id != version_id:
+        if str(item.version_id) != version_id:
             raise StaleDataError()
 
         item.selection = not item.selection
+        # flush first to read the new version without refreshing the item
+        # after the commit
+        database.session.flush()
+        result = {
+            "status": "ok",
+            "selection": item.selection,
+            "version": item.version_id,
+        }
         database.session.commit()
-        return jsonify(
-            {
-                "status": "ok",
-                "selection": item.selection,
-                "version": item.version_id,
-            }
-        )
+        return jsonify(result)
     except StaleDataError:
         database.session.rollback()
         flash(
@@ -204,37 +251,52 @@ def switch_selection():
 
 @blueprint.route("set_number", methods=["POST"])
 @login_required
+@retry_on_busy
 def set_number():
     try:
         data = request.get_json(False, True, False)
         item_id = int(data.get("item_id"))
-        version_id = data.get("version_id")
-        number = Decimal(data.get("number"))
-        to_add = Decimal(data.get("to_add", "0"))
+        version_id = str(data.get("version_id"))
+        number = parse_number(data.get("number"))
+        to_add = parse_number(data.get("to_add", "0"))
+        parse_number(number + to_add)
     except (AttributeError, TypeError, ValueError, DecimalException):
         current_app.logger.error(format_exc())
         current_app.logger.error(f"data: {data}")
         return jsonify({"status": "missing or invalid data"}), 400
 
-    item = Item.query.get(item_id)
-    if item is None or not current_user.has_access(item.category.list_):
+    if current_app.config.get("ITEM_GROUP_COMMIT", False):
+        return write_mutation(
+            {
+                "action": "set_number",
+                "item_id": item_id,
+                "version_id": version_id,
+                "number": number,
+                "to_add": to_add,
+            }
+        )
+
+    item = get_items().filter(Item.item_id == item_id).one_or_none()
+    if item is None or not current_user.has_access(item.list_):
         flash("The item has not been found.", "error")
         return jsonify({"status": "cancel", "cancel_url": url_for("list.read")})
-    list_id = item.category.list_id
+    list_id = item.list_id
 
     try:
-        if item.version_id != version_id:
+        if str(item.version_id) != version_id:
             raise StaleDataError()
 
         item.number = number + to_add
+        # flush first to read the new version without refreshing the item
+        # after the commit
+        database.session.flush()
+        result = {
+            "status": "ok",
+            "number": str(item.number),
+            "version": item.version_id,
+        }
         database.session.commit()
-        return jsonify(
-            {
-                "status": "ok",
-                "number": str(item.number),
-                "version": item.version_id,
-            }
-        )
+        return jsonify(result)
     except StaleDataError:
         database.session.rollback()
         flash(
@@ -246,44 +308,362 @@ def set_number():
         )
 
 
+@blueprint.route("add_number", methods=["POST"])
+@login_required
+@retry_on_busy
+def add_number():
+    try:
+        data = request.get_json(False, True, False)
+        item_id = int(data.get("item_id"))
+        to_add = parse_number(data.get("to_add"))
+    except (AttributeError, TypeError, ValueError, DecimalException):
+        current_app.logger.error(format_exc())
+        current_app.logger.error(f"data: {data}")
+        return jsonify({"status": "missing or invalid data"}), 400
+
+    item = get_items().filter(Item.item_id == item_id).one_or_none()
+    if item is None or not current_user.has_access(item.list_):
+        flash("The item has not been found.", "error")
+        return jsonify({"status": "cancel", "cancel_url": url_for("list.read")})
+
+    if item.type_ is not ItemType.number:
+        return jsonify({"status": "missing or invalid data"}), 400
+    list_id = item.list_id
+
+    # no version sent by the client: the number is incremented in sql from its
+    # current value, concurrent increments don't conflict; checked in sql too,
+    # the type and the number may have changed since the item was read
+    table = Item.__table__
+    result = database.session.execute(
+        table.update()
+        .where(
+            table.c.item_id == item.item_id,
+            table.c.type == ItemType.number,
+            # compared to the column: the bounds are scaled like the numbers
+            table.c.number < NUMBER_LIMIT - to_add,
+            table.c.number > -NUMBER_LIMIT - to_add,
+        )
+        .values(number=table.c.number + to_add, version_id=table.c.version_id + 1)
+        .returning(table.c.number, table.c.version_id)
+    ).one_or_none()
+    if result is None:
+        database.session.rollback()
+        flash("The number has not been updated, it would be out of range.", "error")
+        return jsonify(
+            {"status": "cancel", "cancel_url": url_for("list.detail", list_id=list_id)}
+        )
+    number, version_id = result
+
+    # core statement: the change is logged explicitly
+    log_changes(
+        database.session,
+        [
+            {
+                "list_id": item.list_id,
+                "entity": "item",
+                "entity_id": item.item_id,
+                "operation": "update",
+                "version_id": version_id,
+                "fields": {"number": str(number)},
+                "created_on": datetime.utcnow(),
+            }
+        ],
+    )
+    touch_lists(database.session, [item.list_id])
+    touch_categories(
+        database.session,
+        deltas={item.category_id: (0, 0, 0, 0, to_add)},
+    )
+    database.session.commit()
+
+    return jsonify({"status": "ok", "number": str(number), "version": version_id})
+
+
 @blueprint.route("set_text", methods=["POST"])
 @login_required
+@retry_on_busy
 def set_text():
     try:
         data = request.get_json(False, True, False)
         item_id = int(data.get("item_id"))
-        version_id = data.get("version_id")
+        version_id = str(data.get("version_id"))
         text = data.get("text")
+        if not isinstance(text, str):
+            raise TypeError(f"invalid text: {text!r}")
     except (AttributeError, TypeError, ValueError):
         current_app.logger.error(format_exc())
         current_app.logger.error(f"data: {data}")
         return jsonify({"status": "missing or invalid data"}), 400
 
-    item = Item.query.get(item_id)
-    if item is None or not current_user.has_access(item.category.list_):
+    if current_app.config.get("ITEM_GROUP_COMMIT", False):
+        return write_mutation(
+            {
+                "action": "set_text",
+                "item_id": item_id,
+                "version_id": version_id,
+                "text": text,
+            }
+        )
+
+    item = get_items().filter(Item.item_id == item_id).one_or_none()
+    if item is None or not current_user.has_access(item.list_):
         flash("The item has not been found.", "error")
         return jsonify({"status": "cancel", "cancel_url": url_for("list.read")})
-    list_id = item.category.list_id
+    list_id = item.list_id
 
     try:
-        if item.version_id != version_id:
+        if str(item.version_id) != version_id:
             raise StaleDataError()
 
         item.text = text
+        # flush first to read the new version without refreshing the item
+        # after the commit
+        database.session.flush()
+        result = {
+            "status": "ok",
+            "version": item.version_id,
+            # the text is not returned (it's already in the input element)
+        }
+        database.session.commit()
+        return jsonify(result)
+    except StaleDataError:
+        database.session.rollback()
+        flash(
+            "The item has not been updated due to concurrent modification.",
+            "error",
+        )
+        return jsonify(
+            {"status": "cancel", "cancel_url": url_for("list.detail", list_id=list_id)}
+        )
+
+
+def parse_number(value):
+    number = Decimal(value)
+    if (
+        not number.is_finite()
+        or abs(number) >= NUMBER_LIMIT
+        or number != round(number, NUMBER_SCALE)
+    ):
+        raise ValueError(f"invalid number: {value}")
+
+    return number
+
+
+def parse_mutation(data):
+    mutation = {
+        "action": data.get("action"),
+        "item_id": int(data.get("item_id")),
+        "version_id": str(data.get("version_id")),
+    }
+
+    if mutation["action"] not in MUTATIONS:
+        raise ValueError(f"invalid action: {mutation['action']}")
+    elif mutation["action"] == "set_number":
+        mutation["number"] = parse_number(data.get("number"))
+        mutation["to_add"] = parse_number(data.get("to_add", "0"))
+        parse_number(mutation["number"] + mutation["to_add"])
+    elif mutation["action"] == "set_text":
+        mutation["text"] = data.get("text")
+        if not isinstance(mutation["text"], str):
+            raise TypeError(f"invalid text: {mutation['text']!r}")
+
+    return mutation
+
+
+def apply_mutation(item, mutation):
+    if mutation["action"] == "switch_selection":
+        item.selection = not item.selection
+    elif mutation["action"] == "set_number":
+        item.number = mutation["number"] + mutation["to_add"]
+    elif mutation["action"] == "set_text":
+        item.text = mutation["text"]
+
+
+# keys of the results of the mutations sent to the clients
+RESULT_KEYS = {
+    "switch_selection": ("status", "selection", "version"),
+    "set_number": ("status", "number", "version"),
+    "set_text": ("status", "version"),
+}
+
+
+def apply_mutations(writes):
+    # the same checks as the batch, each mutation is flushed to get its version
+    # like in its own request
+    items = {
+        item.item_id: item
+        for item in get_items().filter(
+            Item.item_id.in_({mutation["item_id"] for mutation, _ in writes})
+        )
+    }
+
+    results = []
+    for mutation, user in writes:
+        item = items.get(mutation["item_id"])
+        if item is None or not user.has_access(item.list_):
+            results.append({"status": "not found"})
+            continue
+        list_id = item.list_id
+        if str(item.version_id) != mutation["version_id"]:
+            results.append({"status": "stale", "list_id": list_id})
+            continue
+
+        # a failed mutation only rolls back its savepoint, its error is raised
+        # in its own request; a busy database fails the whole group
+        try:
+            with database.session.begin_nested():
+                apply_mutation(item, mutation)
+                database.session.flush()
+        except OperationalError:
+            raise
+        except StaleDataError:
+            results.append({"status": "stale", "list_id": list_id})
+        except Exception as error:
+            results.append(error)
+        else:
+            results.append(
+                {
+                    "status": "ok",
+                    "list_id": list_id,
+                    "selection": item.selection,
+                    "number": str(item.number),
+                    "version": item.version_id,
+                }
+            )
+
+    return results
+
+
+def commit_mutations(writes):
+    # the write lock is taken at once: pysqlite doesn't begin a transaction
+    # before a savepoint, the released savepoints would be committed
+    if database.session.get_bind().dialect.name == "sqlite":
+        database.session.execute(text("BEGIN IMMEDIATE"))
+
+    try:
+        results = apply_mutations(writes)
         database.session.commit()
+        return results
+    except StaleDataError:
+        # updated by another process: the mutations are committed one by one
+        database.session.rollback()
+        if len(writes) == 1:
+            return [{"status": "stale", "list_id": None}]
+
+        return [commit_mutations([write])[0] for write in writes]
+
+
+group_writer = GroupWriter(retry_on_busy(commit_mutations))
+
+
+def write_mutation(mutation):
+    result = group_writer.submit(mutation, current_user._get_current_object())
+
+    if result["status"] == "not found":
+        flash("The item has not been found.", "error")
+        return jsonify({"status": "cancel", "cancel_url": url_for("list.read")})
+    elif result["status"] == "stale":
+        flash(
+            "The item has not been updated due to concurrent modification.",
+            "error",
+        )
         return jsonify(
             {
-                "status": "ok",
-                "version": item.version_id,
-                # the text is not returned (it's already in the input element)
+                "status": "cancel",
+                "cancel_url": (
+                    url_for("list.detail", list_id=result["list_id"])
+                    if result["list_id"] is not None
+                    else url_for("list.read")
+                ),
             }
         )
+
+    return jsonify({key: result[key] for key in RESULT_KEYS[mutation["action"]]})
+
+
+@blueprint.route("batch", methods=["POST"])
+@login_required
+@retry_on_busy
+def batch():
+    try:
+        data = request.get_json(False, True, False)
+        mutations = [parse_mutation(mutation) for mutation in data.get("mutations")]
+    except (AttributeError, TypeError, ValueError, DecimalException):
+        current_app.logger.error(format_exc())
+        current_app.logger.error(f"data: {data}")
+        return jsonify({"status": "missing or invalid data"}), 400
+
+    # load all the items with their list in one query
+    items = {
+        item.item_id: item
+        for item in get_items().filter(
+            Item.item_id.in_({mutation["item_id"] for mutation in mutations})
+        )
+        if current_user.has_access(item.list_)
+    }
+
+    # an item is only mutated if all its mutations are based on the version
+    # read before the batch, the client sends the same version for all the
+    # mutations of an item queued between two batches
+    statuses = {}
+    for mutation in mutations:
+        item = items.get(mutation["item_id"])
+        if item is None:
+            statuses[mutation["item_id"]] = "not found"
+        elif str(item.version_id) != mutation["version_id"]:
+            statuses[mutation["item_id"]] = "stale"
+        else:
+            statuses.setdefault(mutation["item_id"], "ok")
+
+    for mutation in mutations:
+        if statuses[mutation["item_id"]] == "ok":
+            apply_mutation(items[mutation["item_id"]], mutation)
+
+    list_ids = {item.list_id for item in items.values()}
+    cancel_url = (
+        url_for("list.detail", list_id=list_ids.pop())
+        if len(list_ids) == 1
+        else url_for("list.read")
+    )
+
+    try:
+        # flush first to read the new versions without refreshing the items
+        # after the commit, then commit all the mutations in one transaction
+        database.session.flush()
+        results = []
+        for item_id, status in statuses.items():
+            result = {"item_id": item_id, "status": status}
+            if status == "ok":
+                item = items[item_id]
+                result.update(
+                    {
+                        "selection": item.selection,
+                        "number": str(item.number),
+                        "version": item.version_id,
+                    }
+                )
+            results.append(result)
+        database.session.commit()
     except StaleDataError:
         database.session.rollback()
+        flash(
+            "The items have not been updated due to concurrent modification.",
+            "error",
+        )
+        return jsonify({"status": "cancel", "cancel_url": cancel_url})
+
+    if "not found" in statuses.values():
+        flash("The item has not been found.", "error")
+        return jsonify(
+            {"status": "cancel", "cancel_url": url_for("list.read"), "results": results}
+        )
+    elif "stale" in statuses.values():
         flash(
             "The item has not been updated due to concurrent modification.",
             "error",
         )
         return jsonify(
-            {"status": "cancel", "cancel_url": url_for("list.detail", list_id=list_id)}
+            {"status": "cancel", "cancel_url": cancel_url, "results": results}
         )
+
+    return jsonify({"status": "ok", "results": results})
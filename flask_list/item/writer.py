@@ -0,0 +1,83 @@
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from flask import current_app
+
+from flask_list import database
+
+
+class Write:
+    __slots__ = ("arguments", "done", "result", "error")
+
+    def __init__(self, arguments):
+        self.arguments = arguments
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class GroupWriter:
+    # group commit: one thread of the process collects the writes sent by the
+    # requests during a few milliseconds and commits them in one transaction,
+    # the handler returns the result or the error of each write
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.queue = Queue()
+        self.lock = Lock()
+        self.thread = None
+
+    def submit(self, *arguments):
+        application = current_app._get_current_object()
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(
+                    target=self.run, args=(application,), name="writer", daemon=True
+                )
+                self.thread.start()
+
+        write = Write(arguments)
+        self.queue.put(write)
+        write.done.wait()
+        if write.error is not None:
+            raise write.error
+
+        return write.result
+
+    def collect(self, window, size):
+        writes = [self.queue.get()]
+        deadline = monotonic() + window
+        while len(writes) < size:
+            timeout = deadline - monotonic()
+            if timeout <= 0:
+                break
+            try:
+                writes.append(self.queue.get(timeout=timeout))
+            except Empty:
+                break
+
+        return writes
+
+    def run(self, application):
+        window = application.config.get("ITEM_GROUP_COMMIT_WINDOW", 0.005)
+        size = application.config.get("ITEM_GROUP_COMMIT_SIZE", 100)
+        while True:
+            writes = self.collect(window, size)
+            with application.app_context():
+                try:
+                    results = self.handler([write.arguments for write in writes])
+                    # a result can be the error of its write alone
+                    for write, result in zip(writes, results):
+                        if isinstance(result, Exception):
+                            write.error = result
+                        else:
+                            write.result = result
+                except Exception as error:
+                    database.session.rollback()
+                    application.logger.exception("group commit")
+                    for write in writes:
+                        write.error = error
+
+            for write in writes:
+                write.done.set()
@@ -0,0 +1,74 @@
+import os
+from hashlib import sha256
+from time import time
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+from werkzeug.http import is_resource_modified
+
+templates_modified_on = None
+
+
+def get_templates_modified_on():
+    # a deployment with new templates must not be served from the browser cache
+    global templates_modified_on
+    if templates_modified_on is None:
+        template_folder = os.path.join(
+            current_app.root_path, current_app.template_folder
+        )
+        templates_modified_on = max(
+            os.path.getmtime(os.path.join(directory, file_name))
+            for directory, _, file_names in os.walk(template_folder)
+            for file_name in file_names
+        )
+
+    return templates_modified_on
+
+
+def make_etag(*parts):
+    # the flashed messages are only rendered once, they must not be cached
+    if "_flashes" in session:
+        return None
+
+    # the page embeds a csrf token which expires, the etag changes before it
+    time_limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+    csrf_period = int(time() // max(time_limit // 2, 1)) if time_limit else 0
+
+    # created now if missing: the first rendered page has the same etag as its
+    # revalidations
+    generate_csrf()
+    parts = (
+        request.endpoint,
+        current_user.user_id,
+        session.get("csrf_token"),
+        csrf_period,
+        get_templates_modified_on(),
+    ) + parts
+
+    return sha256(repr(parts).encode()).hexdigest()
+
+
+def is_not_modified(etag, last_modified=None):
+    return etag is not None and not is_resource_modified(
+        request.environ, etag=etag, last_modified=last_modified
+    )
+
+
+def make_conditional_response(response, etag, last_modified=None):
+    response = make_response(response)
+
+    if etag is not None:
+        response.set_etag(etag)
+        response.last_modified = last_modified
+
+    # the browser has to revalidate the page on each navigation
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+
+    return response
+
+
+def make_not_modified_response(etag, last_modified=None):
+    return make_conditional_response(("", 304), etag, last_modified)
@@ -0,0 +1,124 @@
+from threading import Event, Lock, Thread
+from time import sleep
+
+import click
+from flask import current_app
+from sqlalchemy import delete, select
+
+from flask_list import database
+from flask_list.list import blueprint
+from flask_list.models import Category, Change, Item, List
+from flask_list.retry import run_with_retry
+
+
+def delete_chunk(model, condition, size):
+    # one short transaction per chunk: the other writers wait for one chunk at
+    # most, not for the whole list
+    primary_key = model.__mapper__.primary_key[0]
+    count = database.session.execute(
+        delete(model)
+        .where(primary_key.in_(select(primary_key).where(condition).limit(size)))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    database.session.commit()
+
+    return count
+
+
+def delete_rows(model, condition, report):
+    size = current_app.config.get("DELETION_CHUNK_SIZE", 1000)
+    pause = current_app.config.get("DELETION_PAUSE", 0.01)
+    count = 0
+    while True:
+        chunk_count = run_with_retry(delete_chunk, model, condition, size)
+        count += chunk_count
+        if chunk_count < size:
+            return count
+
+        report(f"{model.__tablename__}: {count} row(s) deleted")
+        sleep(pause)
+
+
+def delete_pending(report):
+    # the categories then the lists marked as deleting, resumed where a
+    # previous run stopped: the deleted rows are already committed
+    category_count = list_count = 0
+
+    categories = database.session.execute(
+        select(Category.category_id, Category.list_id).where(
+            Category.deleting == True  # noqa: E712
+        )
+    ).all()
+    for category_id, list_id in categories:
+        item_count = delete_rows(Item, Item.category_id == category_id, report)
+        delete_rows(Category, Category.category_id == category_id, report)
+        report(f"category {category_id} of list {list_id} deleted ({item_count} items)")
+        category_count += 1
+
+    list_ids = database.session.scalars(
+        select(List.list_id).where(List.deleting == True)  # noqa: E712
+    ).all()
+    for list_id in list_ids:
+        item_count = delete_rows(Item, Item.list_id == list_id, report)
+        delete_rows(Category, Category.list_id == list_id, report)
+        delete_rows(Change, Change.list_id == list_id, report)
+        delete_rows(List, List.list_id == list_id, report)
+        report(f"list {list_id} deleted ({item_count} items)")
+        list_count += 1
+
+    return category_count, list_count
+
+
+class BackgroundDeleter:
+    # one thread per process deletes the lists and categories marked as
+    # deleting, woken up by the deletes and periodically for the failed ones
+
+    def __init__(self):
+        self.lock = Lock()
+        self.wakeup = Event()
+        self.thread = None
+
+    def notify(self, application):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(
+                    target=self.run, args=(application,), name="deleter", daemon=True
+                )
+                self.thread.start()
+
+        self.wakeup.set()
+
+    def run(self, application):
+        interval = application.config.get("DELETION_INTERVAL", 60)
+        while True:
+            self.wakeup.clear()
+            with application.app_context():
+                try:
+                    delete_pending(application.logger.info)
+                except Exception:
+                    database.session.rollback()
+                    application.logger.exception("background deleter")
+
+            self.wakeup.wait(interval)
+
+
+background_deleter = BackgroundDeleter()
+
+
+@blueprint.before_app_request
+def start_background_deleter():
+    # the deletions interrupted by a restart are resumed without waiting for a
+    # new one
+    if (
+        background_deleter.thread is None
+        and current_app.config.get("DELETION_BACKGROUND", True)
+        and not current_app.testing
+    ):
+        background_deleter.notify(current_app._get_current_object())
+
+
+# cli command: flask list deletion
+@blueprint.cli.command("deletion")
+def deletion():
+    category_count, list_count = delete_pending(click.echo)
+    click.echo(f"{category_count} category(ies) and {list_count} list(s) deleted")
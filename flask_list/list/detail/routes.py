@@ -1,9 +1,105 @@
-from flask import flash, redirect, render_template, url_for
+import json
+from itertools import groupby
+from time import monotonic
+
+from flask import (
+    Response,
+    current_app,
+    flash,
+    get_flashed_messages,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_template,
+    url_for,
+)
 from flask_login import current_user, login_required
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+from sqlalchemy import func
 
-from flask_list import database
+from flask_list import broker, cache, database
 from flask_list.list import blueprint
-from flask_list.models import Category, Item, List
+from flask_list.list.conditional import (
+    get_templates_modified_on,
+    is_not_modified,
+    make_conditional_response,
+    make_etag,
+    make_not_modified_response,
+)
+from flask_list.models import Category, Change, Item, List
+
+# items fetched at once when streaming
+ITEMS_PER_FETCH = 500
+# above this number of changes, reloading the page is cheaper
+CHANGES_LIMIT = 500
+# the event streams are closed regularly to check the access again (seconds)
+EVENTS_DURATION = 300
+EVENTS_KEEPALIVE = 15
+# reconnection delay of the event sources (milliseconds)
+EVENTS_RETRY = 5000
+
+
+def query_items(category_ids):
+    return (
+        Item.query.join(Category)
+        .filter(Item.category_id.in_(category_ids))
+        .order_by(Category.name, Item.name)
+    )
+
+
+def render_tables(list_id, streaming=False):
+    categories = (
+        Category.query.filter(
+            Category.list_id == list_id, Category.deleting == False  # noqa: E712
+        )
+        .order_by(Category.name)
+        .all()
+    )
+
+    # a table is rendered again only when the revision of its category changes
+    keys = [
+        f"category_{category.category_id}_{category.revision}"
+        f"_{get_templates_modified_on()}"
+        for category in categories
+    ]
+    tables = dict(zip(keys, cache.get_many(*keys))) if keys else {}
+
+    # the items are in the order of the tables, grouped by category
+    missing = [
+        category.category_id
+        for category, key in zip(categories, keys)
+        if tables[key] is None
+    ]
+    items = ()
+    if missing:
+        items = query_items(missing)
+        if streaming:
+            items = items.yield_per(ITEMS_PER_FETCH)
+    groups = groupby(items, lambda item: item.category_id)
+    group = next(groups, None)
+
+    rendered = {}
+    for category, key in zip(categories, keys):
+        if tables[key] is None:
+            category_items = ()
+            if group is not None and group[0] == category.category_id:
+                category_items = group[1]
+
+            rendered[key] = tables[key] = render_template(
+                "list/detail/read_category.html.jinja",
+                category=category,
+                items=category_items,
+            )
+
+            if category_items:
+                group = next(groups, None)
+
+        yield Markup(tables[key])
+
+    if rendered:
+        cache.set_many(rendered)
 
 
 @blueprint.route("/detail/<int:list_id>")
@@ -14,19 +110,164 @@ def detail(list_id):
         flash("The list has not been found.", "error")
         return redirect(url_for("list.read"))
 
-    categories_items = (
-        database.session.query(Category, Item)
-        .outerjoin(Item)
-        .join(List)
-        .filter(List.list_id == list_id)
-        .order_by(Category.name, Item.name)
+    etag = make_etag(list_.list_id, list_.revision, list_.cleaned_change_id)
+    if is_not_modified(etag, list_.updated_on):
+        return make_not_modified_response(etag, list_.updated_on)
+
+    # the page syncs the changes made after its rendering
+    since = max(
+        database.session.query(func.max(Change.change_id))
+        .filter(Change.list_id == list_id)
+        .scalar()
+        or 0,
+        list_.cleaned_change_id,
+    )
+
+    streaming = current_app.config.get("LIST_STREAMING", False)
+    if streaming:
+        # the session is saved before streaming: the flashed messages must be
+        # removed and the csrf token created beforehand
+        get_flashed_messages()
+        generate_csrf()
+
+    return make_conditional_response(
+        (stream_template if streaming else render_template)(
+            "list/detail/read.html.jinja",
+            title="Details of List",
+            list=list_,
+            tables=render_tables(list_id, streaming),
+            since=since,
+            events=current_app.config.get("LIST_EVENTS", False),
+            cancel_url=url_for("list.read"),
+        ),
+        etag,
+        list_.updated_on,
+    )
+
+
+@blueprint.route("/detail/<int:list_id>/changes")
+@login_required
+def changes(list_id):
+    list_ = List.query.get(list_id)
+    if list_ is None or not current_user.has_access(list_):
+        flash("The list has not been found.", "error")
+        return jsonify({"status": "cancel", "cancel_url": url_for("list.read")})
+
+    since = request.args.get("since", 0, type=int)
+    # the deleted changes can't be synced, the page is reloaded
+    if since < list_.cleaned_change_id:
+        return jsonify(
+            {
+                "status": "cancel",
+                "cancel_url": url_for("list.detail", list_id=list_id),
+            }
+        )
+
+    changes = (
+        Change.query.filter(Change.list_id == list_id, Change.change_id > since)
+        .order_by(Change.change_id)
+        .limit(CHANGES_LIMIT + 1)
         .all()
     )
 
-    return render_template(
-        "list/detail/read.html.jinja",
-        title="Details of List",
-        list=list_,
-        categories_items=categories_items,
-        cancel_url=url_for("list.read"),
+    if len(changes) > CHANGES_LIMIT:
+        return jsonify(
+            {
+                "status": "cancel",
+                "cancel_url": url_for("list.detail", list_id=list_id),
+            }
+        )
+
+    return jsonify(
+        {
+            "status": "ok",
+            "since": changes[-1].change_id if changes else since,
+            "changes": [change.to_dict() for change in changes],
+        }
+    )
+
+
+@blueprint.route("/detail/<int:list_id>/aggregates")
+@login_required
+def aggregates(list_id):
+    list_ = List.query.get(list_id)
+    if list_ is None or not current_user.has_access(list_):
+        flash("The list has not been found.", "error")
+        return jsonify({"status": "cancel", "cancel_url": url_for("list.read")})
+
+    # maintained on each flush, no item is read
+    categories = Category.query.filter(
+        Category.list_id == list_id, Category.deleting == False  # noqa: E712
+    ).order_by(Category.name)
+
+    return jsonify(
+        {
+            "status": "ok",
+            "categories": [category.get_aggregates() for category in categories],
+        }
+    )
+
+
+@blueprint.route("/detail/<int:list_id>/events")
+@login_required
+def events(list_id):
+    # a page rendered before the events were disabled polls instead
+    if not current_app.config.get("LIST_EVENTS", False):
+        return Response(status=204)  # the event source stops reconnecting
+
+    list_ = List.query.get(list_id)
+    if list_ is None or not current_user.has_access(list_):
+        return Response(status=204)  # the event source stops reconnecting
+
+    channel = f"list_{list_id}"
+    backend = broker.backend
+    subscription = backend.subscribe(channel)
+
+    # the changes committed before the subscription, the event source sends the
+    # last change received when it reconnects
+    since = request.headers.get("Last-Event-ID", type=int) or request.args.get(
+        "since", 0, type=int
+    )
+    # the deleted changes can't be sent, the page is reloaded
+    cleaned_change_id = list_.cleaned_change_id
+    changes = [
+        change.to_dict()
+        for change in Change.query.filter(
+            Change.list_id == list_id, Change.change_id > since
+        )
+        .order_by(Change.change_id)
+        .limit(CHANGES_LIMIT)
+    ]
+    # the database isn't used while streaming
+    database.session.remove()
+
+    def stream():
+        try:
+            # sent at once, the servers send the headers with the first chunk
+            yield f"retry: {EVENTS_RETRY}\n\n"
+
+            if len(changes) == CHANGES_LIMIT or since < cleaned_change_id:
+                yield "event: reload\ndata: {}\n\n"
+                return
+
+            last_change_id = since
+            for change in changes:
+                last_change_id = change["change_id"]
+                yield f"id: {last_change_id}\ndata: {json.dumps(change)}\n\n"
+
+            closed_on = monotonic() + EVENTS_DURATION
+            while monotonic() < closed_on:
+                change = backend.listen(subscription, EVENTS_KEEPALIVE)
+                if change is None:
+                    yield ": keepalive\n\n"
+                elif change["change_id"] > last_change_id:
+                    last_change_id = change["change_id"]
+                    yield f"id: {last_change_id}\ndata: {json.dumps(change)}\n\n"
+        finally:
+            backend.unsubscribe(channel, subscription)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -16,7 +16,10 @@ class CreateForm(FlaskForm):
     cancel = SubmitField("Cancel", render_kw={"type": "button"})
 
     def validate_name(self, name):
-        list_ = List.query.filter_by(name=name.data).first()
+        # the name of a list being deleted is free
+        list_ = List.query.filter(
+            List.name == name.data, List.deleting == False  # noqa: E712
+        ).first()
         if list_ is not None:
             raise ValidationError("The list name already exists.")
 
@@ -38,7 +41,9 @@ class UpdateForm(FlaskForm):
 
     def validate_name(self, name):
         if name.data != self.original_name:
-            list_ = List.query.filter_by(name=name.data).first()
+            list_ = List.query.filter(
+                List.name == name.data, List.deleting == False  # noqa: E712
+            ).first()
             if list_ is not None:
                 raise ValidationError("The list name already exists.")
 
@@ -1,17 +1,58 @@
-from flask import flash, redirect, render_template, request, url_for
+from datetime import datetime, timedelta
+
+from flask import (
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
 from flask_login import current_user, login_required
-from sqlalchemy import func, literal_column, or_
+from sqlalchemy import func, or_, select, tuple_, union
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import StaleDataError
 
 from flask_list import database
 from flask_list.list import blueprint
+from flask_list.list.conditional import (
+    is_not_modified,
+    make_conditional_response,
+    make_etag,
+    make_not_modified_response,
+)
+from flask_list.list.deletion import background_deleter
 from flask_list.list.forms import CreateForm, DeleteForm, UpdateForm
-from flask_list.models import Category, Item, List
+from flask_list.models import Category, Change, List
+from flask_list.retry import retry_on_busy
+
+LISTS_PER_PAGE = 50
+
+
+# cli command: flask list cleaning
+@blueprint.cli.command("cleaning")
+def change_cleaning():
+    expired_on = datetime.utcnow() - timedelta(days=1)
+    # the lists keep their last deleted change, the feed can't be synced from an
+    # older one
+    database.session.query(List).filter(
+        List.list_id.in_(select(Change.list_id).where(Change.created_on < expired_on))
+    ).update(
+        {
+            "cleaned_change_id": select(func.max(Change.change_id))
+            .where(Change.list_id == List.list_id, Change.created_on < expired_on)
+            .scalar_subquery()
+        },
+        synchronize_session=False,
+    )
+    Change.query.filter(Change.created_on < expired_on).delete()
+    database.session.commit()
 
 
 @blueprint.route("/create", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def create():
     form = CreateForm()
     if form.validate_on_submit():
@@ -43,6 +84,7 @@ def create():
 
 @blueprint.route("/update/<int:list_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def update(list_id):
     list_ = List.query.get(list_id)
     if list_ is None or not current_user.has_access(list_):
@@ -52,7 +94,7 @@ def update(list_id):
     form = UpdateForm(list_.name)
     if form.validate_on_submit():
         try:
-            if list_.version_id != form.version_id.data:
+            if str(list_.version_id) != form.version_id.data:
                 raise StaleDataError()
 
             list_.name = form.name.data
@@ -82,6 +124,7 @@ def update(list_id):
 
 @blueprint.route("/delete/<int:list_id>", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def delete(list_id):
     list_ = List.query.get(list_id)
     if list_ is None or not current_user.has_access(list_):
@@ -91,26 +134,17 @@ def delete(list_id):
     form = DeleteForm()
     if form.validate_on_submit():
         try:
-            if list_.version_id != form.version_id.data:
+            if str(list_.version_id) != form.version_id.data:
                 raise StaleDataError()
 
-            database.session.query(Item).filter(
-                Item.category_id.in_(
-                    database.session.query(Category)
-                    .filter(Category.list_id == list_id)
-                    .with_entities(Category.category_id)
-                )
-            ).delete(synchronize_session=False)
-
-            database.session.query(Category).filter(Category.list_id == list_id).delete(
-                synchronize_session=False
-            )
-
-            database.session.query(List).filter(List.list_id == list_id).delete(
-                synchronize_session=False
+            # hidden at once, its rows are deleted in chunks in the background
+            database.session.query(List).filter(List.list_id == list_id).update(
+                {"deleting": True}, synchronize_session=False
             )
 
             database.session.commit()
+            if current_app.config.get("DELETION_BACKGROUND", True):
+                background_deleter.notify(current_app._get_current_object())
             flash("The list has been deleted.")
         except StaleDataError:
             database.session.rollback()
@@ -125,38 +159,124 @@ def delete(list_id):
         form.private.data = list_.private
         form.version_id.data = list_.version_id
 
-    category_count = (
-        database.session.query(func.count(literal_column("*")))
-        .filter(Category.list_id == list_id)
-        .scalar()
-    )
-
-    item_count = (
-        database.session.query(func.count(literal_column("*")))
-        .select_from(Item)
-        .join(Category)
-        .filter(Category.list_id == list_id)
-        .scalar()
-    )
-
     return render_template(
         "list/delete.html.jinja",
         title="Delete List",
         form=form,
-        category_count=category_count,
-        item_count=item_count,
+        category_count=list_.category_count,
+        item_count=list_.item_count,
         cancel_url=url_for("list.read"),
     )
 
 
+def query_lists_revision(user_id):
+    # any change of a visible list updates it and bumps its revision, a deleted
+    # one changes the count
+    return select(
+        func.count(), func.max(List.updated_on), func.sum(List.revision)
+    ).where(
+        or_(List.private == False, List.created_by == user_id),  # noqa: E712
+        List.deleting == False,  # noqa: E712
+    )
+
+
+def query_lists(user_id, after_name=None, after_id=None):
+    # one branch per index: the public lists and the lists of the user, each
+    # branch reads its index from the position of the previous page
+    branches = []
+    for condition in (
+        List.private == False,  # noqa: E712
+        List.created_by == user_id,
+    ):
+        branch = select(List.list_id, List.name).where(
+            condition, List.deleting == False  # noqa: E712
+        )
+        if after_name is not None:
+            branch = branch.where(
+                tuple_(List.name, List.list_id) > tuple_(after_name, after_id)
+            )
+        branches.append(
+            select(
+                branch.order_by(List.name, List.list_id)
+                .limit(LISTS_PER_PAGE + 1)
+                .subquery()
+            )
+        )
+    page = union(*branches).subquery()
+
+    return (
+        List.query.join(page, List.list_id == page.c.list_id)
+        .order_by(List.name, List.list_id)
+        .limit(LISTS_PER_PAGE + 1)
+    )
+
+
+def get_lists(after_name=None, after_id=None):
+    lists = query_lists(current_user.user_id, after_name, after_id).all()
+
+    return lists[:LISTS_PER_PAGE], len(lists) > LISTS_PER_PAGE
+
+
 @blueprint.route("/read")
 @login_required
 def read():
-    lists = List.query.filter(
-        or_(
-            List.private == False,  # noqa: E712
-            List.created_by == current_user.user_id,
-        )
-    ).order_by(List.name)
+    # one aggregate of the visible lists, the page isn't read to revalidate it
+    etag = make_etag(
+        *database.session.execute(query_lists_revision(current_user.user_id)).one()
+    )
+    if is_not_modified(etag):
+        return make_not_modified_response(etag)
+
+    lists, more = get_lists()
+
+    return make_conditional_response(
+        render_template(
+            "list/read.html.jinja", title="List", lists=lists, more=more, offset=0
+        ),
+        etag,
+    )
+
+
+@blueprint.route("/summary/<int:list_id>")
+@login_required
+def summary(list_id):
+    list_ = List.query.get(list_id)
+    if list_ is None or not current_user.has_access(list_):
+        flash("The list has not been found.", "error")
+        return jsonify({"status": "cancel", "cancel_url": url_for("list.read")})
+
+    # maintained on each flush, no item is read
+    categories = Category.query.filter(
+        Category.list_id == list_id, Category.deleting == False  # noqa: E712
+    ).order_by(Category.name)
+
+    return jsonify(
+        {
+            "status": "ok",
+            "list": list_.get_summary(),
+            "categories": [category.get_aggregates() for category in categories],
+        }
+    )
 
-    return render_template("list/read.html.jinja", title="List", lists=lists)
+
+@blueprint.route("/read_rows")
+@login_required
+def read_rows():
+    try:
+        after_name = request.args["after_name"]
+        after_id = int(request.args["after_id"])
+        offset = int(request.args.get("offset", 0))
+    except (KeyError, ValueError):
+        return jsonify({"status": "missing or invalid data"}), 400
+
+    lists, more = get_lists(after_name, after_id)
+
+    return jsonify(
+        {
+            "status": "ok",
+            "rows": render_template(
+                "list/read_rows.html.jinja", lists=lists, offset=offset
+            ),
+            "more": more,
+        }
+    )
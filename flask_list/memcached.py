@@ -0,0 +1,57 @@
+import pylibmc
+from flask import current_app, has_app_context
+from flask_caching.backends.memcache import MemcachedCache
+
+# consistent hashing across the servers and short timeouts: a slow or stopped
+# server is a cache miss, the data is read from the database
+BEHAVIORS = {
+    "tcp_nodelay": True,
+    "tcp_keepalive": True,
+    "ketama": True,
+    "connect_timeout": 100,  # milliseconds
+    "send_timeout": 200_000,  # microseconds
+    "receive_timeout": 200_000,  # microseconds
+    "retry_timeout": 2,  # seconds
+    "dead_timeout": 10,  # seconds
+    "remove_failed": 2,
+}
+# results of the failed calls
+FALLBACKS = {
+    "get_multi": lambda keys, *args, **kwargs: {},
+    "set_multi": lambda mapping, *args, **kwargs: list(mapping),
+}
+
+
+class PooledClient:
+    # a pylibmc client isn't thread safe, each call reserves a client of the pool
+
+    def __init__(self, client, size):
+        self.pool = pylibmc.ClientPool(client, size)
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            try:
+                with self.pool.reserve(block=True) as client:
+                    return getattr(client, name)(*args, **kwargs)
+            except pylibmc.Error as error:
+                if has_app_context():
+                    current_app.logger.warning(f"memcached {name}: {error!r}")
+                fallback = FALLBACKS.get(name)
+                return fallback(*args, **kwargs) if fallback is not None else None
+
+        return call
+
+
+class PooledMemcachedCache(MemcachedCache):
+    # CACHE_TYPE = "flask_list.memcached.PooledMemcachedCache"
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        client = pylibmc.Client(
+            config["CACHE_MEMCACHED_SERVERS"],
+            binary=config.get("CACHE_MEMCACHED_BINARY", True),
+            behaviors={**BEHAVIORS, **config.get("CACHE_MEMCACHED_BEHAVIORS", {})},
+        )
+        args.append(PooledClient(client, config.get("CACHE_MEMCACHED_POOL_SIZE", 8)))
+        kwargs.update(dict(key_prefix=config["CACHE_KEY_PREFIX"]))
+        return cls(*args, **kwargs)
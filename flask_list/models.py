@@ -1,16 +1,16 @@
 import enum
 from datetime import datetime
 from decimal import Decimal
+from itertools import chain
 from time import time
-from uuid import uuid4
 
 import jwt
 from flask import current_app
 from flask_login import UserMixin
-from sqlalchemy import types
+from sqlalchemy import bindparam, event, inspect, select, types
 from werkzeug.security import check_password_hash, generate_password_hash
 
-from flask_list import database
+from flask_list import broker, database
 
 
 class SqliteNumeric(types.TypeDecorator):
@@ -23,10 +23,75 @@ class SqliteNumeric(types.TypeDecorator):
         return Decimal(value if value is not None else "0")
 
 
-class User(database.Model, UserMixin):
-    user_id = database.Column(
-        database.Integer, nullable=False, unique=True, index=True, primary_key=True
-    )
+class IntegerEnum(types.TypeDecorator):
+    # enums stored as their integer values instead of their names
+    impl = types.SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enum_class = enum_class
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        return (
+            self.enum_class[value] if isinstance(value, str) else self.enum_class(value)
+        ).value
+
+    def process_result_value(self, value, dialect):
+        return self.enum_class(value) if value is not None else None
+
+
+class ScaledNumeric(types.TypeDecorator):
+    # exact decimals stored as integers scaled by 10 ** scale: sqlite can sum,
+    # compare and sort them
+    impl = types.BigInteger
+    cache_ok = True
+
+    def __init__(self, scale, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scale = scale
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        scaled = Decimal(value).scaleb(self.scale)
+        if scaled != scaled.to_integral_value():
+            raise ValueError(f"more than {self.scale} decimal places: {value}")
+        return int(scaled)
+
+    def process_result_value(self, value, dialect):
+        number = Decimal(value if value is not None else 0).scaleb(-self.scale)
+        # without the trailing zeros and the exponent of the integers
+        return (
+            number.quantize(Decimal(1))
+            if number == number.to_integral_value()
+            else number.normalize()
+        )
+
+
+# decimal places and bound of the item numbers, the scaled numbers fit in 64 bits
+NUMBER_SCALE = 6
+NUMBER_LIMIT = 10**12
+
+
+class AccessMixin:
+    __slots__ = ()
+
+    def has_access(self, object_):
+        return (
+            (object_.private is False or object_.created_by == self.user_id)
+            and not object_.deleting
+            if isinstance(object_, List)
+            else False
+        )
+
+
+class User(database.Model, UserMixin, AccessMixin):
+    user_id = database.Column(database.Integer, nullable=False, primary_key=True)
     email = database.Column(
         database.String(1000), nullable=False, unique=True, index=True
     )
@@ -38,12 +103,10 @@ class User(database.Model, UserMixin):
         default=datetime.utcnow,
         onupdate=datetime.utcnow,
     )
-    version_id = database.Column(database.String(32), nullable=False)
+    version_id = database.Column(database.Integer, nullable=False)
 
-    __mapper_args__ = {
-        "version_id_col": version_id,
-        "version_id_generator": lambda version: uuid4().hex,
-    }
+    # the versions are counters incremented on each update
+    __mapper_args__ = {"version_id_col": version_id}
     __table_args__ = {"sqlite_autoincrement": True}
 
     def __repr__(self):
@@ -78,46 +141,138 @@ class User(database.Model, UserMixin):
 
         return User.query.get(user_id)
 
-    def has_access(self, object_):
-        return (
-            (object_.private is False or object_.created_by == self.user_id)
-            if isinstance(object_, List)
-            else False
-        )
+    def get_principal(self):
+        return Principal(self.user_id, self.email, self.active, self.version_id)
+
+
+class Principal(AccessMixin):
+    # the logged in user kept in the caches: small and without the password hash
+    __slots__ = ("user_id", "email", "active", "version_id")
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, email, active, version_id):
+        self.user_id = user_id
+        self.email = email
+        self.active = active
+        self.version_id = version_id
+
+    def __repr__(self):
+        return f"<Principal id: {self.user_id} email: {self.email}>"
+
+    @property
+    def is_active(self):
+        return self.active
+
+    def get_id(self):
+        return str(self.user_id)
 
 
 class List(database.Model):
-    list_id = database.Column(
-        database.Integer, nullable=False, unique=True, index=True, primary_key=True
-    )
-    name = database.Column(
-        database.String(1000), nullable=False, unique=True, index=True
-    )
+    list_id = database.Column(database.Integer, nullable=False, primary_key=True)
+    # unique among the lists not being deleted (ix_list_name)
+    name = database.Column(database.String(1000), nullable=False)
     created_by = database.Column(database.Integer, nullable=False)
     private = database.Column(database.Boolean(), nullable=False)
-    version_id = database.Column(database.String(32), nullable=False)
+    version_id = database.Column(database.Integer, nullable=False)
+    # bumped on any change of the list, its categories or its items
+    revision = database.Column(
+        database.Integer, nullable=False, default=0, server_default="0"
+    )
+    updated_on = database.Column(
+        database.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="1970-01-01 00:00:00",
+    )
+    # the changes up to this id have been deleted by the cleaning, the pages
+    # synced from an older change are reloaded
+    cleaned_change_id = database.Column(
+        database.Integer, nullable=False, default=0, server_default="0"
+    )
+    # counters updated with the differences on each flush
+    category_count = database.Column(
+        database.Integer, nullable=False, default=0, server_default="0"
+    )
+    item_count = database.Column(
+        database.Integer, nullable=False, default=0, server_default="0"
+    )
+    # hidden once deleted, its rows are deleted in chunks in the background
+    deleting = database.Column(
+        database.Boolean(),
+        nullable=False,
+        default=False,
+        server_default="0",
+        index=True,
+    )
 
     # one to many: list <-> categories
     categories = database.relationship("Category", back_populates="list_")
 
-    __mapper_args__ = {
-        "version_id_col": version_id,
-        "version_id_generator": lambda version: uuid4().hex,
-    }
-    __table_args__ = {"sqlite_autoincrement": True}
+    __mapper_args__ = {"version_id_col": version_id}
+    __table_args__ = (
+        # the visible lists are read by name from the public and own lists
+        database.Index("ix_list_private_name", "private", "name"),
+        database.Index("ix_list_created_by_name", "created_by", "name"),
+        # a deleted list frees its name at once
+        database.Index(
+            "ix_list_name",
+            "name",
+            unique=True,
+            sqlite_where=deleting == False,  # noqa: E712
+        ),
+        {"sqlite_autoincrement": True},
+    )
 
     def __repr__(self):
         return f"<List id: {self.list_id} name: {self.name}>"
 
+    def get_summary(self):
+        return {
+            "list_id": self.list_id,
+            "name": self.name,
+            "private": self.private,
+            "category_count": self.category_count,
+            "item_count": self.item_count,
+            "updated_on": self.updated_on.isoformat(),
+        }
+
 
 class Category(database.Model):
-    category_id = database.Column(
-        database.Integer, nullable=False, unique=True, index=True, primary_key=True
-    )
+    category_id = database.Column(database.Integer, nullable=False, primary_key=True)
     name = database.Column(
         database.String(1000), nullable=False, index=True  # unique per list
     )
-    version_id = database.Column(database.String(32), nullable=False)
+    version_id = database.Column(database.Integer, nullable=False)
+    # bumped on any change of the category or its items
+    revision = database.Column(
+        database.Integer, nullable=False, default=0, server_default="0"
+    )
+    # aggregates of the items, updated with their differences on each flush
+    item_count = database.Column(
+        database.Integer, nullable=False, default=0, server_default="0"
+    )
+    selection_count = database.Column(
+        database.Integer, nullable=False, default=0, server_default="0"
+    )
+    selected_count = database.Column(
+        database.Integer, nullable=False, default=0, server_default="0"
+    )
+    number_count = database.Column(
+        database.Integer, nullable=False, default=0, server_default="0"
+    )
+    number_sum = database.Column(
+        ScaledNumeric(NUMBER_SCALE), nullable=False, default=0, server_default="0"
+    )
+    # hidden once deleted, its items are deleted in chunks in the background
+    deleting = database.Column(
+        database.Boolean(),
+        nullable=False,
+        default=False,
+        server_default="0",
+        index=True,
+    )
 
     # one to many: list <-> categories
     list_ = database.relationship("List", back_populates="categories")
@@ -133,18 +288,33 @@ class Category(database.Model):
         "Item", back_populates="category", cascade="all, delete-orphan"
     )
 
-    __mapper_args__ = {
-        "version_id_col": version_id,
-        "version_id_generator": lambda version: uuid4().hex,
-    }
+    __mapper_args__ = {"version_id_col": version_id}
     __table_args__ = (
-        database.UniqueConstraint("list_id", "name"),
+        # a deleted category frees its name at once
+        database.Index(
+            "ix_category_list_id_name",
+            "list_id",
+            "name",
+            unique=True,
+            sqlite_where=deleting == False,  # noqa: E712
+        ),
         {"sqlite_autoincrement": True},
     )
 
     def __repr__(self):
         return f"<Category id: {self.category_id} name: {self.name}>"
 
+    def get_aggregates(self):
+        return {
+            "category_id": self.category_id,
+            "name": self.name,
+            "item_count": self.item_count,
+            "selection_count": self.selection_count,
+            "selected_count": self.selected_count,
+            "number_count": self.number_count,
+            "number_sum": str(self.number_sum),
+        }
+
 
 class ItemType(enum.Enum):
     selection = 0
@@ -153,32 +323,47 @@ class ItemType(enum.Enum):
 
 
 class Item(database.Model):
-    item_id = database.Column(
-        database.Integer, nullable=False, unique=True, index=True, primary_key=True
-    )
+    item_id = database.Column(database.Integer, nullable=False, primary_key=True)
     name = database.Column(
         database.String(1000), nullable=False, index=True  # unique per category
     )
-    type_ = database.Column("type", database.Enum(ItemType), nullable=False)
-    selection = database.Column(database.Boolean, nullable=False)
+    # active history: the previous values are needed by the category aggregates
+    type_ = database.column_property(
+        database.Column("type", IntegerEnum(ItemType), nullable=False),
+        active_history=True,
+    )
+    selection = database.column_property(
+        database.Column(database.Boolean, nullable=False), active_history=True
+    )
     # number = database.Column(database.Numeric, nullable=False)
-    number = database.Column(SqliteNumeric, nullable=False)
+    number = database.column_property(
+        database.Column(ScaledNumeric(NUMBER_SCALE), nullable=False),
+        active_history=True,
+    )
     text = database.Column(database.String(1000), nullable=False)
-    version_id = database.Column(database.String(32), nullable=False)
+    version_id = database.Column(database.Integer, nullable=False)
 
     # one to many: category <-> items
     category = database.relationship("Category", back_populates="items")
-    category_id = database.Column(
+    category_id = database.column_property(
+        database.Column(
+            database.Integer,
+            database.ForeignKey("category.category_id"),
+            nullable=False,
+            index=True,
+        ),
+        active_history=True,
+    )
+    # denormalized from the category: the item and its list are read in one query
+    list_ = database.relationship("List", viewonly=True)
+    list_id = database.Column(
         database.Integer,
-        database.ForeignKey("category.category_id"),
+        database.ForeignKey("list.list_id"),
         nullable=False,
         index=True,
     )
 
-    __mapper_args__ = {
-        "version_id_col": version_id,
-        "version_id_generator": lambda version: uuid4().hex,
-    }
+    __mapper_args__ = {"version_id_col": version_id}
     __table_args__ = (
         database.UniqueConstraint("category_id", "name"),
         {"sqlite_autoincrement": True},
@@ -186,3 +371,327 @@ class Item(database.Model):
 
     def __repr__(self):
         return f"<Item id: {self.item_id} name: {self.name}>"
+
+
+class Change(database.Model):
+    # autoincrement: the change ids are never reused, the clients sync from them
+    change_id = database.Column(database.Integer, nullable=False, primary_key=True)
+    # no foreign key: the changes outlive the deleted categories and items
+    list_id = database.Column(database.Integer, nullable=False, index=True)
+    entity = database.Column(database.String(8), nullable=False)
+    entity_id = database.Column(database.Integer, nullable=False)
+    operation = database.Column(database.String(6), nullable=False)
+    version_id = database.Column(database.Integer)
+    fields = database.Column(database.JSON, nullable=False)
+    created_on = database.Column(
+        database.DateTime, nullable=False, default=datetime.utcnow
+    )
+
+    # keys sent to the clients
+    KEYS = ("change_id", "entity", "entity_id", "operation", "version_id", "fields")
+    # fields recorded per entity
+    FIELDS = {
+        "category": ("name",),
+        "item": ("name", "type_", "selection", "number", "text", "category_id"),
+    }
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    def __repr__(self):
+        return f"<Change id: {self.change_id} {self.operation} {self.entity}>"
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in Change.KEYS}
+
+
+class Email(database.Model):
+    # outbox: the emails are deleted once sent
+    email_id = database.Column(database.Integer, nullable=False, primary_key=True)
+    subject = database.Column(database.String(1000), nullable=False)
+    sender = database.Column(database.String(1000), nullable=False)
+    recipients = database.Column(database.JSON, nullable=False)
+    text_body = database.Column(database.Text, nullable=False)
+    html_body = database.Column(database.Text, nullable=False)
+    attempts = database.Column(database.Integer, nullable=False, default=0)
+    # next attempt, pushed back while an attempt is in progress or after a failure
+    send_after = database.Column(
+        database.DateTime, nullable=False, default=datetime.utcnow, index=True
+    )
+    last_error = database.Column(database.String(1000))
+    created_on = database.Column(
+        database.DateTime, nullable=False, default=datetime.utcnow
+    )
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    def __repr__(self):
+        return f"<Email id: {self.email_id} subject: {self.subject}>"
+
+
+# list and category columns updated with the differences of their content
+COUNTERS = ("category_count", "item_count")
+AGGREGATES = (
+    "item_count",
+    "selection_count",
+    "selected_count",
+    "number_count",
+    "number_sum",
+)
+
+
+def touch_lists(session, list_ids=(), deltas=None):
+    # core statement: the version of the list must not change, a concurrent
+    # update of the list itself would fail otherwise
+    deltas = deltas or {}
+    if list_ids or deltas:
+        table = List.__table__
+        session.execute(
+            table.update()
+            .where(table.c.list_id == bindparam("b_list_id"))
+            .values(
+                revision=table.c.revision + 1,
+                updated_on=datetime.utcnow(),
+                **{key: table.c[key] + bindparam(f"b_{key}") for key in COUNTERS},
+            ),
+            [
+                dict(
+                    zip(
+                        (f"b_{key}" for key in COUNTERS),
+                        deltas.get(list_id, (0,) * len(COUNTERS)),
+                    ),
+                    b_list_id=list_id,
+                )
+                for list_id in set(list_ids) | set(deltas)
+            ],
+        )
+
+
+def touch_categories(session, category_ids=(), deltas=None):
+    # core statement: the version of the category must not change
+    deltas = deltas or {}
+    if category_ids or deltas:
+        table = Category.__table__
+        session.execute(
+            table.update()
+            .where(table.c.category_id == bindparam("b_category_id"))
+            .values(
+                revision=table.c.revision + 1,
+                **{
+                    key: table.c[key] + bindparam(f"b_{key}", type_=table.c[key].type)
+                    for key in AGGREGATES
+                },
+            ),
+            [
+                dict(
+                    zip(
+                        (f"b_{key}" for key in AGGREGATES),
+                        deltas.get(category_id, (0,) * len(AGGREGATES)),
+                    ),
+                    b_category_id=category_id,
+                )
+                for category_id in set(category_ids) | set(deltas)
+            ],
+        )
+
+
+def add_deltas(deltas, key, values, sign=1):
+    deltas[key] = tuple(
+        delta + sign * value
+        for delta, value in zip(deltas.get(key, (0,) * len(values)), values)
+    )
+
+
+def get_aggregates(item, previous=False):
+    # the contribution of an item to the aggregates of its category, before or
+    # after the flush
+    state = inspect(item)
+    category_id, type_, selection, number = (
+        (
+            state.attrs[field].history.deleted[0]
+            if previous and state.attrs[field].history.deleted
+            else getattr(item, field)
+        )
+        for field in ("category_id", "type_", "selection", "number")
+    )
+
+    type_ = ItemType[type_] if isinstance(type_, str) else type_
+    return category_id, (
+        1,
+        int(type_ is ItemType.selection),
+        int(type_ is ItemType.selection and selection),
+        int(type_ is ItemType.number),
+        Decimal(number) if type_ is ItemType.number else Decimal(0),
+    )
+
+
+def log_changes(session, changes):
+    # core statement: the changes are logged while flushing
+    if changes:
+        table = Change.__table__
+        change_ids = session.scalars(
+            table.insert().returning(table.c.change_id, sort_by_parameter_order=True),
+            changes,
+        ).all()
+
+        # published once committed
+        session.info.setdefault("changes", []).extend(
+            dict(change, change_id=change_id)
+            for change, change_id in zip(changes, change_ids)
+        )
+
+
+def get_change(session, instance, entity, entity_id):
+    state = inspect(instance)
+
+    if instance in session.deleted:
+        operation, fields = "delete", ()
+    elif instance in session.new:
+        operation, fields = "insert", Change.FIELDS[entity]
+    else:
+        operation = "update"
+        fields = [
+            field
+            for field in Change.FIELDS[entity]
+            if state.attrs[field].history.has_changes()
+        ]
+
+    values = {}
+    for field in fields:
+        value = getattr(instance, field)
+        if field == "number":
+            value = str(Decimal(value))
+        elif isinstance(value, enum.Enum):
+            value = value.name
+        values[field] = value
+
+    return {
+        "entity": entity,
+        "entity_id": entity_id,
+        "operation": operation,
+        "version_id": None if operation == "delete" else instance.version_id,
+        "fields": values,
+        "created_on": datetime.utcnow(),
+    }
+
+
+@event.listens_for(database.session, "before_flush")
+def denormalize_items(session, flush_context, instances):
+    items = [
+        instance
+        for instance in chain(session.new, session.dirty)
+        if isinstance(instance, Item)
+        and (
+            instance.list_id is None
+            or inspect(instance).attrs.category_id.history.has_changes()
+            or inspect(instance).attrs.category.history.has_changes()
+        )
+    ]
+
+    if items:
+        table = Category.__table__
+        category_lists = dict(
+            session.execute(
+                select(table.c.category_id, table.c.list_id).where(
+                    table.c.category_id.in_(
+                        {item.category_id for item in items} - {None}
+                    )
+                )
+            ).all()
+        )
+        for item in items:
+            state = inspect(item)
+            category = state.dict.get("category")
+            if (
+                category is not None
+                and not state.attrs.category_id.history.has_changes()
+            ):
+                # set through the relationship: its id is only copied by the
+                # flush, the category may be new in a known list
+                list_id = category.list_id
+                if list_id is None and category.list_ is not None:
+                    list_id = category.list_.list_id
+            else:
+                list_id = category_lists.get(item.category_id)
+            if list_id is not None:
+                item.list_id = list_id
+
+
+@event.listens_for(database.session, "after_flush")
+def track_changes(session, flush_context):
+    list_ids, category_ids = set(), set()
+    changes, list_deltas, category_deltas = [], {}, {}
+
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if instance in session.dirty and not session.is_modified(instance):
+            continue
+
+        if instance in session.new or instance in session.deleted:
+            sign = 1 if instance in session.new else -1
+            if isinstance(instance, Item):
+                add_deltas(list_deltas, instance.list_id, (0, 1), sign)
+            elif isinstance(instance, Category):
+                add_deltas(list_deltas, instance.list_id, (1, 0), sign)
+
+        if isinstance(instance, Item):
+            list_ids.add(instance.list_id)
+            changes.append(
+                dict(
+                    get_change(session, instance, "item", instance.item_id),
+                    list_id=instance.list_id,
+                )
+            )
+
+            # an item moved to another category changes both categories
+            for previous, sign in ((True, -1), (False, 1)):
+                if instance in (session.new if previous else session.deleted):
+                    continue
+
+                add_deltas(category_deltas, *get_aggregates(instance, previous), sign)
+        elif isinstance(instance, Category):
+            list_ids.add(instance.list_id)
+            category_ids.add(instance.category_id)
+            changes.append(
+                dict(
+                    get_change(session, instance, "category", instance.category_id),
+                    list_id=instance.list_id,
+                )
+            )
+        elif isinstance(instance, List):
+            list_ids.add(instance.list_id)
+
+    log_changes(session, changes)
+    touch_lists(session, list_ids, list_deltas)
+    touch_categories(session, category_ids, category_deltas)
+
+
+@event.listens_for(database.session, "after_commit")
+def publish_changes(session):
+    # also called when a savepoint is released, published with its transaction
+    if session.in_nested_transaction():
+        return
+
+    session.info.pop("savepoints", None)
+    for change in session.info.pop("changes", ()):
+        broker.publish(
+            f"list_{change['list_id']}", {key: change.get(key) for key in Change.KEYS}
+        )
+
+
+@event.listens_for(database.session, "after_transaction_create")
+def mark_changes(session, transaction):
+    # the changes logged in a savepoint are discarded with it, not the others
+    if transaction.nested:
+        session.info.setdefault("savepoints", {})[transaction] = len(
+            session.info.get("changes", ())
+        )
+
+
+@event.listens_for(database.session, "after_soft_rollback")
+def discard_changes(session, previous_transaction):
+    if previous_transaction.nested:
+        count = session.info.get("savepoints", {}).pop(previous_transaction, None)
+        if count is not None:
+            del session.info.get("changes", [])[count:]
+    else:
+        session.info.pop("savepoints", None)
+        session.info.pop("changes", None)
@@ -0,0 +1,6 @@
+from flask import Blueprint
+
+# cli commands: flask mail ...
+blueprint = Blueprint("mail", __name__)
+
+from flask_list.outbox import sender  # noqa: E402, F401
@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta
+from smtplib import SMTPConnectError, SMTPException, SMTPServerDisconnected
+from threading import Event, Lock, Thread
+
+import click
+from flask import current_app
+from flask_mail import BadHeaderError, Message
+from sqlalchemy import delete, select, update
+
+from flask_list import database, mail
+from flask_list.models import Email
+from flask_list.outbox import blueprint
+
+# an attempt in progress keeps its emails for this time, a crashed sender doesn't
+# lose them
+LEASE = timedelta(minutes=10)
+
+
+def queue_email(subject, sender, recipients, text_body, html_body):
+    database.session.add(
+        Email(
+            subject=subject,
+            sender=sender,
+            recipients=recipients,
+            text_body=text_body,
+            html_body=html_body,
+        )
+    )
+    database.session.commit()
+
+    if current_app.config.get("MAIL_BACKGROUND_SENDER", True):
+        background_sender.notify(current_app._get_current_object())
+
+
+def claim_emails():
+    # in one statement: the senders of the other processes claim other emails
+    now = datetime.utcnow()
+    due = (
+        select(Email.email_id)
+        .where(
+            Email.send_after <= now,
+            Email.attempts < current_app.config.get("MAIL_MAX_ATTEMPTS", 5),
+        )
+        .order_by(Email.send_after)
+        .limit(current_app.config.get("MAIL_BATCH_SIZE", 50))
+    )
+    emails = database.session.execute(
+        update(Email)
+        .where(Email.email_id.in_(due))
+        .values(attempts=Email.attempts + 1, send_after=now + LEASE)
+        .returning(
+            Email.email_id,
+            Email.subject,
+            Email.sender,
+            Email.recipients,
+            Email.text_body,
+            Email.html_body,
+            Email.attempts,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    database.session.commit()
+
+    return emails
+
+
+def get_message(email):
+    message = Message(email.subject, sender=email.sender, recipients=email.recipients)
+    message.body = email.text_body
+    message.html = email.html_body
+
+    return message
+
+
+def retry_email(email, error):
+    # exponential backoff: 1, 2, 4, 8... intervals
+    interval = current_app.config.get("MAIL_RETRY_INTERVAL", 60)
+    delay = timedelta(seconds=interval * 2 ** (email.attempts - 1))
+    database.session.execute(
+        update(Email)
+        .where(Email.email_id == email.email_id)
+        .values(send_after=datetime.utcnow() + delay, last_error=repr(error)[:1000])
+        .execution_options(synchronize_session=False)
+    )
+    database.session.commit()
+
+    if email.attempts < current_app.config.get("MAIL_MAX_ATTEMPTS", 5):
+        current_app.logger.warning(
+            f"email {email.email_id} not sent (attempt {email.attempts}): {error!r}"
+        )
+    else:
+        current_app.logger.error(
+            f"email {email.email_id} not sent, no more attempts: {error!r}"
+        )
+
+
+def release_emails(emails, error):
+    # the connection failed, not the emails: the attempt isn't counted and the
+    # emails wait for the next run without backoff
+    interval = current_app.config.get("MAIL_RETRY_INTERVAL", 60)
+    database.session.execute(
+        update(Email)
+        .where(Email.email_id.in_([email.email_id for email in emails]))
+        .values(
+            attempts=Email.attempts - 1,
+            send_after=datetime.utcnow() + timedelta(seconds=interval),
+            last_error=repr(error)[:1000],
+        )
+        .execution_options(synchronize_session=False)
+    )
+    database.session.commit()
+
+    current_app.logger.warning(
+        f"{len(emails)} email(s) not sent, no connection: {error!r}"
+    )
+
+
+def send_emails():
+    # the emails of a batch are sent on one connection, the sent emails are
+    # deleted one by one: a crash sends again at most one email
+    sent_count = failed_count = 0
+    pending = claim_emails()
+    while pending:
+        try:
+            with mail.connect() as connection:
+                while pending:
+                    email = pending[0]
+                    try:
+                        connection.send(get_message(email))
+                    except (SMTPServerDisconnected, SMTPConnectError):
+                        raise
+                    except (SMTPException, BadHeaderError, ValueError) as error:
+                        retry_email(email, error)
+                        failed_count += 1
+                    else:
+                        database.session.execute(
+                            delete(Email)
+                            .where(Email.email_id == email.email_id)
+                            .execution_options(synchronize_session=False)
+                        )
+                        database.session.commit()
+                        sent_count += 1
+                    pending.pop(0)
+        except (SMTPException, OSError) as error:
+            # no connection: the emails not sent yet are sent by the next run
+            release_emails(pending, error)
+            failed_count += len(pending)
+            break
+
+        pending = claim_emails()
+
+    return sent_count, failed_count
+
+
+class BackgroundSender:
+    # one thread per process sends the queued emails, woken up by the new emails
+    # and periodically for the retries
+
+    def __init__(self):
+        self.lock = Lock()
+        self.wakeup = Event()
+        self.thread = None
+
+    def notify(self, application):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(
+                    target=self.run, args=(application,), name="mail", daemon=True
+                )
+                self.thread.start()
+
+        self.wakeup.set()
+
+    def run(self, application):
+        interval = application.config.get("MAIL_RETRY_INTERVAL", 60)
+        while True:
+            with application.app_context():
+                try:
+                    send_emails()
+                except Exception:
+                    database.session.rollback()
+                    application.logger.exception("mail sender")
+
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+
+
+background_sender = BackgroundSender()
+
+
+@blueprint.before_app_request
+def start_background_sender():
+    # the emails queued before a restart are sent without waiting for a new one
+    if (
+        background_sender.thread is None
+        and current_app.config.get("MAIL_BACKGROUND_SENDER", True)
+        and not current_app.testing
+    ):
+        background_sender.notify(current_app._get_current_object())
+
+
+# cli command: flask mail flush
+@blueprint.cli.command("flush")
+def flush():
+    sent_count, failed_count = send_emails()
+    click.echo(f"{sent_count} email(s) sent, {failed_count} email(s) failed")
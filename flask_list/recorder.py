@@ -0,0 +1,107 @@
+import hmac
+import json
+import secrets
+from io import BytesIO
+from threading import Lock
+from time import perf_counter, time
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import ClosingIterator
+
+# the ids are replaced by pseudonyms, the same id gives the same pseudonym in a
+# trace; the values of the other keys are replaced by their type
+ID_KEYS = ("list_id", "category_id", "item_id")
+KEPT_KEYS = ("action",)
+MAX_PAYLOAD_SIZE = 1024 * 1024
+
+
+class Recorder:
+    def __init__(self, application=None):
+        if application is not None:
+            self.init_app(application)
+
+    def init_app(self, application):
+        path = application.config.get("TRAFFIC_RECORD")
+        if not path:
+            return
+
+        self.url_map = application.url_map
+        self.file = open(path, "a", buffering=1)
+        self.lock = Lock()
+        # not kept: the pseudonyms of two traces can't be linked
+        self.key = secrets.token_bytes(16)
+        self.wsgi_app = application.wsgi_app
+        application.wsgi_app = self
+
+    def get_pseudonym(self, value):
+        return "#" + hmac.digest(self.key, str(value).encode(), "sha256")[:6].hex()
+
+    def get_shape(self, value, key=None):
+        if isinstance(value, dict):
+            return {key: self.get_shape(value, key) for key, value in value.items()}
+        if isinstance(value, list):
+            return [self.get_shape(value, key) for value in value]
+        if key in ID_KEYS and value is not None:
+            return self.get_pseudonym(f"{key}:{value}")
+        if key in KEPT_KEYS and isinstance(value, str):
+            return value
+
+        return type(value).__name__
+
+    def get_payload(self, environ):
+        if not environ.get("CONTENT_TYPE", "").startswith("application/json"):
+            return None
+
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return None
+        if not 0 < length <= MAX_PAYLOAD_SIZE:
+            return None
+
+        # read and given back to the application
+        data = environ["wsgi.input"].read(length)
+        environ["wsgi.input"] = BytesIO(data)
+        environ["CONTENT_LENGTH"] = str(len(data))
+        try:
+            return self.get_shape(json.loads(data))
+        except ValueError:
+            return "invalid"
+
+    def __call__(self, environ, start_response):
+        started_on = perf_counter()
+        trace = {
+            "time": time(),
+            "client": self.get_pseudonym(
+                f"{environ.get('REMOTE_ADDR')} {environ.get('HTTP_USER_AGENT')}"
+            ),
+            "method": environ.get("REQUEST_METHOD"),
+            "endpoint": None,
+        }
+        try:
+            rule, arguments = self.url_map.bind_to_environ(environ).match(
+                return_rule=True
+            )
+            trace["endpoint"] = rule.endpoint
+            trace["arguments"] = self.get_shape(arguments)
+            trace["query"] = sorted(
+                key.split("=")[0]
+                for key in environ.get("QUERY_STRING", "").split("&")
+                if key
+            )
+            trace["payload"] = self.get_payload(environ)
+        except HTTPException:
+            pass
+
+        def record_response(status, headers, exc_info=None):
+            trace["status"] = int(status.split(" ", 1)[0])
+            return start_response(status, headers, exc_info)
+
+        def record():
+            # the streamed bodies are included
+            trace["duration"] = perf_counter() - started_on
+            line = json.dumps(trace, separators=(",", ":"))
+            with self.lock:
+                self.file.write(line + "\n")
+
+        return ClosingIterator(self.wsgi_app(environ, record_response), record)
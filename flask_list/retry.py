@@ -0,0 +1,97 @@
+from collections import Counter
+from functools import wraps
+from random import uniform
+from threading import Lock
+from time import sleep
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy.exc import OperationalError
+
+from flask_list import database
+
+# the busy timeout doesn't apply to a transaction upgraded from read to write
+# after another connection has written (wal snapshot): sqlite fails at once
+BUSY_ERRORS = {"SQLITE_BUSY", "SQLITE_BUSY_SNAPSHOT", "SQLITE_LOCKED"}
+BUSY_MESSAGES = ("database is locked", "database table is locked", "is busy")
+
+
+class RetryCounts:
+    # retries of the process per endpoint: retried (each new attempt), recovered
+    # (succeeded after a retry) and exhausted (failed after the last attempt)
+
+    def __init__(self):
+        self.lock = Lock()
+        self.counts = Counter()
+
+    def add(self, endpoint, name):
+        with self.lock:
+            self.counts[(endpoint, name)] += 1
+            return self.counts[(endpoint, name)]
+
+    def get(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+retry_counts = RetryCounts()
+
+
+def is_busy(error):
+    # the conflicts (IntegrityError, StaleDataError) are not retried, running the
+    # unit of work again would fail the same way
+    if not isinstance(error, OperationalError):
+        return False
+    if getattr(error.orig, "sqlite_errorname", None) in BUSY_ERRORS:
+        return True
+
+    return any(message in str(error.orig) for message in BUSY_MESSAGES)
+
+
+def run_with_retry(unit, *args, **kwargs):
+    # runs the unit of work again after a rollback with an exponential backoff
+    # with full jitter: the writers in conflict don't retry at the same time
+    attempts = current_app.config.get("DATABASE_RETRY_ATTEMPTS", 4)
+    base = current_app.config.get("DATABASE_RETRY_DELAY", 0.02)
+    cap = current_app.config.get("DATABASE_RETRY_MAX_DELAY", 0.5)
+    endpoint = request.endpoint if has_request_context() else unit.__name__
+
+    attempt = 1
+    while True:
+        try:
+            result = unit(*args, **kwargs)
+        except OperationalError as error:
+            if not is_busy(error):
+                raise
+            database.session.rollback()
+            if attempt >= attempts:
+                retry_counts.add(endpoint, "exhausted")
+                current_app.logger.error(
+                    f"{endpoint}: database busy after {attempt} attempts: {error.orig}"
+                )
+                raise
+
+            retry_counts.add(endpoint, "retried")
+            if has_request_context():
+                g.database_retries = attempt
+            sleep(uniform(0, min(cap, base * 2 ** (attempt - 1))))
+            attempt += 1
+        else:
+            if attempt > 1:
+                count = retry_counts.add(endpoint, "recovered")
+                current_app.logger.info(
+                    f"{endpoint}: database busy, recovered after {attempt} attempts"
+                    f" ({count} recovered)"
+                )
+            return result
+
+
+def retry_on_busy(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # the views read the json data without caching it, it's cached to be read
+        # again by the next attempts; the group writer has no request
+        if has_request_context() and request.is_json:
+            request.get_data()
+        return run_with_retry(view, *args, **kwargs)
+
+    return wrapper
@@ -1,39 +1,112 @@
+var batch = (function () {
+    var queue = [];
+    var sending = false;
+
+    var flush = function () {
+        if (sending || queue.length === 0) {
+            return;
+        }
+
+        // the versions are read when sending, the previous batch has updated them
+        var entries = queue;
+        queue = [];
+        sending = true;
+
+        $.ajax({
+            type: "POST",
+            url: '{{ url_for("item.batch") }}',
+            headers: { "X-CSRFToken": "{{ csrf_token() }}" },
+            contentType: "application/json; charset=UTF-8",
+            data: JSON.stringify({
+                mutations: $.map(entries, function (entry) {
+                    return $.extend(
+                        {
+                            item_id: $(entry.element).attr("data-item-id"),
+                            version_id: $(entry.element).attr("data-version-id"),
+                        },
+                        entry.mutation
+                    );
+                }),
+            }),
+            dataType: "json",
+        })
+            .done(function (data, textStatus, xhr) {
+                $.each(data.results || [], function (index, result) {
+                    if (result.status !== "ok") {
+                        return true;
+                    }
+                    $.each(entries, function (index, entry) {
+                        if ($(entry.element).attr("data-item-id") === String(result.item_id)) {
+                            entry.done(entry.element, result);
+                        }
+                    });
+                });
+                aggregates.refresh();
+                if (data.status === "cancel") {
+                    window.location.href = data.cancel_url;
+                }
+            })
+            .fail(function (xhr, textStatus, errorThrown) {
+                $.each(entries, function (index, entry) {
+                    entry.fail(entry.element, xhr);
+                });
+            })
+            .always(function () {
+                sending = false;
+                debounce("batch", flush, 250);
+            });
+    };
+
+    return {
+        add: function (element, mutation, done, fail) {
+            queue.push({
+                element: element,
+                mutation: mutation,
+                done: done,
+                fail: fail,
+            });
+            debounce("batch", flush, 250);
+        },
+        queued: function (element) {
+            return $.grep(queue, function (entry) {
+                return entry.element.is(element);
+            }).length;
+        },
+    };
+})();
+
+var show_selection = function (element, selection) {
+    if (selection === false) {
+        $(element)
+            .removeClass("btn-success text-white")
+            .addClass("bg-transparent text-dark")
+            .html(`{{ render_icon("square") }}`);
+    } else if (selection === true) {
+        $(element)
+            .removeClass("bg-transparent text-dark")
+            .addClass("btn-success text-white")
+            .html(`{{ render_icon("check-square") }}`);
+    }
+};
+
 $("tbody").on("click", ".item-selection", function () {
     var element = $(this);
 
-    $.ajax({
-        type: "POST",
-        url: '{{ url_for("item.switch_selection") }}',
-        headers: { "X-CSRFToken": "{{ csrf_token() }}" },
-        contentType: "application/json; charset=UTF-8",
-        data: JSON.stringify({
-            item_id: $(element).attr("data-item-id"),
-            version_id: $(element).attr("data-version-id"),
-        }),
-        dataType: "json",
-    })
-        .done(function (data, textStatus, xhr) {
-            if (data.status === "ok") {
-                if (data.selection === false) {
-                    $(element)
-                        .removeClass("btn-success text-white")
-                        .addClass("bg-transparent text-dark")
-                        .attr("data-version-id", data.version)
-                        .html(`{{ render_icon("square") }}`);
-                } else if (data.selection === true) {
-                    $(element)
-                        .removeClass("bg-transparent text-dark")
-                        .addClass("btn-success text-white")
-                        .attr("data-version-id", data.version)
-                        .html(`{{ render_icon("check-square") }}`);
-                }
-            } else if (data.status === "cancel") {
-                window.location.href = data.cancel_url;
+    // show the new selection immediately, the batch confirms it later
+    show_selection(element, !$(element).hasClass("btn-success"));
+
+    batch.add(
+        element,
+        { action: "switch_selection" },
+        function (element, result) {
+            $(element).attr("data-version-id", result.version);
+            if (!batch.queued(element)) {
+                show_selection(element, result.selection);
             }
-        })
-        .fail(function (xhr, textStatus, errorThrown) {
+        },
+        function (element, xhr) {
             console.log(
-                "POST failed on item.switch_selection." +
+                "POST failed on item.batch (switch_selection)." +
                     " item_id:" +
                     $(element).attr("data-item-id") +
                     " version_id:" +
@@ -41,7 +114,8 @@ $("tbody").on("click", ".item-selection", function () {
                     " responseText:" +
                     xhr.responseText
             );
-        });
+        }
+    );
 });
 
 $("tbody").on("click input", ".item-number", function (event) {
@@ -70,31 +144,19 @@ $("tbody").on("click input", ".item-number", function (event) {
     debounce(
         $(element).attr("data-item-id"),
         function (element) {
-            $.ajax({
-                type: "POST",
-                url: '{{ url_for("item.set_number") }}',
-                headers: { "X-CSRFToken": "{{ csrf_token() }}" },
-                contentType: "application/json; charset=UTF-8",
-                data: JSON.stringify({
-                    item_id: $(element).attr("data-item-id"),
-                    version_id: $(element).attr("data-version-id"),
-                    number: number,
-                }),
-                dataType: "json",
-            })
-                .done(function (data, textStatus, xhr) {
-                    if (data.status === "ok") {
-                        $(element)
-                            .removeClass("fw-bold")
-                            .attr("data-version-id", data.version);
-                    } else if (data.status === "cancel") {
-                        window.location.href = data.cancel_url;
+            batch.add(
+                element,
+                { action: "set_number", number: number },
+                function (element, result) {
+                    $(element).attr("data-version-id", result.version);
+                    if (!batch.queued(element)) {
+                        $(element).removeClass("fw-bold");
                     }
-                })
-                .fail(function (xhr, textStatus, errorThrown) {
+                },
+                function (element, xhr) {
                     $(element).addClass("text-danger");
                     console.log(
-                        "POST failed on item.set_number." +
+                        "POST failed on item.batch (set_number)." +
                             " item_id:" +
                             $(element).attr("data-item-id") +
                             " version_id:" +
@@ -104,7 +166,8 @@ $("tbody").on("click input", ".item-number", function (event) {
                             " responseText:" +
                             xhr.responseText
                     );
-                });
+                }
+            );
         },
         1000,
         element
@@ -121,18 +184,17 @@ $("tbody").on("click", ".item-number-plus, .item-number-minus", function (event)
         return true;
     }
 
-    var number = $(element).val().trim() ? $(element).val().trim() : "0";
     var to_add = $(element_button).hasClass("item-number-plus") ? "1" : "-1";
 
+    // the increment is applied to the current number on the server, concurrent
+    // increments don't conflict
     $.ajax({
         type: "POST",
-        url: '{{ url_for("item.set_number") }}',
+        url: '{{ url_for("item.add_number") }}',
         headers: { "X-CSRFToken": "{{ csrf_token() }}" },
         contentType: "application/json; charset=UTF-8",
         data: JSON.stringify({
             item_id: $(element).attr("data-item-id"),
-            version_id: $(element).attr("data-version-id"),
-            number: number,
             to_add: to_add,
         }),
         dataType: "json",
@@ -142,19 +204,16 @@ $("tbody").on("click", ".item-number-plus, .item-number-minus", function (event)
                 $(element)
                     .val(data.number !== "0" ? data.number : "")
                     .attr("data-version-id", data.version);
+                aggregates.refresh();
             } else if (data.status === "cancel") {
                 window.location.href = data.cancel_url;
             }
         })
         .fail(function (xhr, textStatus, errorThrown) {
             console.log(
-                "POST failed on item.set_number." +
+                "POST failed on item.add_number." +
                     " item_id:" +
                     $(element).attr("data-item-id") +
-                    " version_id:" +
-                    $(element).attr("data-version-id") +
-                    " number:" +
-                    number +
                     " to_add:" +
                     to_add +
                     " responseText:" +
@@ -179,41 +238,32 @@ $("tbody").on("click input", ".item-text", function (event) {
     debounce(
         $(element).attr("data-item-id"),
         function (element) {
-            $.ajax({
-                type: "POST",
-                url: '{{ url_for("item.set_text") }}',
-                headers: { "X-CSRFToken": "{{ csrf_token() }}" },
-                contentType: "application/json; charset=UTF-8",
-                data: JSON.stringify({
-                    item_id: $(element).attr("data-item-id"),
-                    version_id: $(element).attr("data-version-id"),
-                    text: $(element).val(),
-                }),
-                dataType: "json",
-            })
-                .done(function (data, textStatus, xhr) {
-                    if (data.status === "ok") {
-                        $(element)
-                            .removeClass("fw-bold")
-                            .attr("data-version-id", data.version);
-                    } else if (data.status === "cancel") {
-                        window.location.href = data.cancel_url;
+            var text = $(element).val();
+
+            batch.add(
+                element,
+                { action: "set_text", text: text },
+                function (element, result) {
+                    $(element).attr("data-version-id", result.version);
+                    if (!batch.queued(element)) {
+                        $(element).removeClass("fw-bold");
                     }
-                })
-                .fail(function (xhr, textStatus, errorThrown) {
+                },
+                function (element, xhr) {
                     $(element).addClass("text-danger");
                     console.log(
-                        "POST failed on item.set_text." +
+                        "POST failed on item.batch (set_text)." +
                             " item_id:" +
                             $(element).attr("data-item-id") +
                             " version_id:" +
                             $(element).attr("data-version-id") +
                             " text:" +
-                            $(element).val() +
+                            text +
                             " responseText:" +
                             xhr.responseText
                     );
-                });
+                }
+            );
         },
         1000,
         element
@@ -0,0 +1,35 @@
+var aggregates = (function () {
+    var show = function (category) {
+        var element = $(".item-value[data-category-id=" + category.category_id + "]");
+        $(element)
+            .find(".item-selected")
+            .text(
+                category.selection_count
+                    ? category.selected_count + "/" + category.selection_count
+                    : ""
+            );
+        $(element)
+            .find(".item-sum")
+            .text(category.number_count ? category.number_sum : "");
+    };
+
+    var load = function () {
+        $.ajax({
+            type: "GET",
+            url: '{{ url_for("list.aggregates", list_id=list.list_id) }}',
+            dataType: "json",
+        }).done(function (data, textStatus, xhr) {
+            if (data.status === "ok") {
+                $.each(data.categories, function (index, category) {
+                    show(category);
+                });
+            }
+        });
+    };
+
+    return {
+        refresh: function () {
+            debounce("aggregates", load, 500);
+        },
+    };
+})();
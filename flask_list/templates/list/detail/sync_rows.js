@@ -0,0 +1,113 @@
+var sync_rows = (function () {
+    var since = {{ since }};
+    var reload = false;
+
+    var is_pending = function () {
+        return $(".item-number.fw-bold, .item-text.fw-bold").length > 0;
+    };
+
+    var apply_change = function (change) {
+        // only the values are patched, any other change needs a new rendering
+        var values = ["selection", "number", "text"];
+        if (
+            change.entity !== "item" ||
+            change.operation !== "update" ||
+            $.grep(Object.keys(change.fields), function (field) {
+                return values.indexOf(field) < 0;
+            }).length
+        ) {
+            reload = true;
+            return;
+        }
+
+        var element = $(
+            "[data-item-id=" + change.entity_id + "][data-version-id]"
+        );
+        if (
+            !element.length ||
+            $(element).attr("data-version-id") === String(change.version_id) ||
+            $(element).hasClass("fw-bold") ||
+            $(element).hasClass("text-danger") ||
+            batch.queued(element)
+        ) {
+            return;
+        }
+
+        if ("selection" in change.fields) {
+            show_selection(element, change.fields.selection);
+        }
+        if ("number" in change.fields) {
+            $(element).val(change.fields.number !== "0" ? change.fields.number : "");
+        }
+        if ("text" in change.fields) {
+            $(element).val(change.fields.text);
+        }
+        $(element).attr("data-version-id", change.version_id);
+    };
+
+    return {
+        since: function () {
+            return since;
+        },
+        apply: function (data) {
+            if (data.status === "ok") {
+                $.each(data.changes, function (index, change) {
+                    apply_change(change);
+                });
+                if (data.changes.length) {
+                    aggregates.refresh();
+                }
+                since = Math.max(since, data.since);
+            }
+
+            // don't lose the edits not yet sent
+            if ((reload || data.status === "cancel") && !is_pending()) {
+                window.location.href = data.cancel_url || window.location.href;
+            }
+        },
+    };
+})();
+
+var listen_changes = function () {
+    // the changes made in another process are not pushed, the polling stays
+    // as a safety net
+    if (!{{ events|tojson }} || !window.EventSource) {
+        return false;
+    }
+
+    var source = new EventSource(
+        '{{ url_for("list.events", list_id=list.list_id) }}?since=' + sync_rows.since()
+    );
+    source.onmessage = function (event) {
+        var change = JSON.parse(event.data);
+        sync_rows.apply({ status: "ok", changes: [change], since: change.change_id });
+    };
+    source.addEventListener("reload", function (event) {
+        source.close();
+        sync_rows.apply({ status: "cancel" });
+    });
+
+    return true;
+};
+
+(function poll_changes(delay) {
+    setTimeout(function () {
+        if (document.hidden) {
+            poll_changes(delay);
+            return;
+        }
+
+        $.ajax({
+            type: "GET",
+            url: '{{ url_for("list.changes", list_id=list.list_id) }}',
+            data: { since: sync_rows.since() },
+            dataType: "json",
+        })
+            .done(function (data, textStatus, xhr) {
+                sync_rows.apply(data);
+            })
+            .always(function () {
+                poll_changes(delay);
+            });
+    }, delay);
+})(listen_changes() ? 30000 : 5000);
@@ -0,0 +1,60 @@
+var load_more = function () {
+    var element = $("#LoadMore");
+
+    if ($(element).prop("disabled")) {
+        return true;
+    }
+    $(element).prop("disabled", true);
+
+    var last = $("tbody tr:last");
+
+    $.ajax({
+        type: "GET",
+        url: '{{ url_for("list.read_rows") }}',
+        data: {
+            after_name: $(last).attr("data-list-name"),
+            after_id: $(last).attr("data-list-id"),
+            offset: $("tbody tr").length,
+        },
+        dataType: "json",
+    })
+        .done(function (data, textStatus, xhr) {
+            if (data.status === "ok") {
+                $("tbody").append(data.rows);
+                if (!data.more) {
+                    $(element).parent().remove();
+                }
+            }
+        })
+        .fail(function (xhr, textStatus, errorThrown) {
+            console.log(
+                "GET failed on list.read_rows." +
+                    " after_id:" +
+                    $(last).attr("data-list-id") +
+                    " responseText:" +
+                    xhr.responseText
+            );
+        })
+        .always(function () {
+            $(element).prop("disabled", false);
+            // observed again: the next page is loaded if the button is still visible
+            if (observer && $(element).closest("body").length) {
+                observer.unobserve($(element)[0]);
+                observer.observe($(element)[0]);
+            }
+        });
+};
+
+var observer = null;
+if ($("#LoadMore").length) {
+    $("#LoadMore").on("click", load_more);
+
+    if (window.IntersectionObserver) {
+        observer = new IntersectionObserver(function (entries) {
+            if (entries[0].isIntersecting) {
+                load_more();
+            }
+        });
+        observer.observe($("#LoadMore")[0]);
+    }
+}
@@ -0,0 +1,200 @@
+"""compact schema
+
+Revision ID: 3f9d2c81b6e4
+Revises: 76203f8f04aa
+Create Date: 2026-10-18 09:45:03.118927
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import flask_list
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9d2c81b6e4'
+down_revision = '76203f8f04aa'
+branch_labels = None
+depends_on = None
+
+TABLES = ('user', 'list', 'category', 'item')
+
+
+def get_sequences():
+    return dict(
+        op.get_bind().execute(sa.text('SELECT name, seq FROM sqlite_sequence')).all()
+    )
+
+
+def restore_sequences(sequences):
+    # the recreated tables restart their sequences from their rows, the ids of
+    # the deleted rows and of the changes must not be reused
+    current = get_sequences()
+    op.execute('DELETE FROM sqlite_sequence')
+    op.get_bind().execute(
+        sa.text('INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)'),
+        [
+            {'name': name, 'seq': max(seq, current.get(name, 0))}
+            for name, seq in {**current, **sequences}.items()
+        ],
+    )
+
+
+def get_logged_versions(connection):
+    # the text versions logged for each item and category, numbered in their
+    # order: the integer versions follow the history of the changes
+    versions = {}
+    for entity, entity_id, version_id in connection.execute(
+        sa.text(
+            'SELECT entity, entity_id, version_id FROM change'
+            ' WHERE version_id IS NOT NULL ORDER BY change_id'
+        )
+    ):
+        entity_versions = versions.setdefault((entity, entity_id), {})
+        entity_versions.setdefault(version_id, len(entity_versions) + 1)
+
+    return versions
+
+
+def convert_versions():
+    # the rows without logged changes start at version 1, the others continue
+    # their logged history and the changes keep it: no version is reused for
+    # another state, the text versions of the open pages never match
+    connection = op.get_bind()
+    versions = get_logged_versions(connection)
+
+    op.execute('UPDATE "user" SET version_id = 1')
+    op.execute('UPDATE list SET version_id = 1')
+    for table in ('category', 'item'):
+        rows = []
+        for entity_id, version_id in connection.execute(
+            sa.text(f'SELECT {table}_id, version_id FROM {table}')
+        ):
+            entity_versions = versions.get((table, entity_id), {})
+            rows.append(
+                {
+                    'entity_id': entity_id,
+                    'version_id': entity_versions.get(
+                        version_id, len(entity_versions) + 1
+                    ),
+                }
+            )
+        if rows:
+            connection.execute(
+                sa.text(
+                    f'UPDATE {table} SET version_id = :version_id'
+                    f' WHERE {table}_id = :entity_id'
+                ),
+                rows,
+            )
+
+    changes = [
+        {'change_id': change_id, 'version_id': versions[(entity, entity_id)][version_id]}
+        for change_id, entity, entity_id, version_id in connection.execute(
+            sa.text(
+                'SELECT change_id, entity, entity_id, version_id FROM change'
+                ' WHERE version_id IS NOT NULL'
+            )
+        )
+    ]
+    if changes:
+        connection.execute(
+            sa.text('UPDATE change SET version_id = :version_id WHERE change_id = :change_id'),
+            changes,
+        )
+
+
+def upgrade():
+    # the tables referenced by foreign keys are recreated, the foreign keys can
+    # only be disabled outside of a transaction
+    with op.get_context().autocommit_block():
+        op.execute('PRAGMA foreign_keys=OFF')
+
+    sequences = get_sequences()
+
+    convert_versions()
+    op.execute(
+        "UPDATE item SET type = CASE type "
+        "WHEN 'selection' THEN 0 WHEN 'number' THEN 1 ELSE 2 END"
+    )
+
+    for table in TABLES:
+        with op.batch_alter_table(
+            table,
+            schema=None,
+            recreate='always',
+            table_kwargs={'sqlite_autoincrement': True},
+        ) as batch_op:
+            # the primary keys are already indexed by their rowid
+            batch_op.drop_index(f'ix_{table}_{table}_id')
+            batch_op.alter_column('version_id',
+                   existing_type=sa.String(length=32),
+                   type_=sa.Integer(),
+                   existing_nullable=False)
+            if table == 'item':
+                batch_op.alter_column('type',
+                       existing_type=sa.VARCHAR(length=9),
+                       type_=sa.SmallInteger(),
+                       existing_nullable=False)
+
+    with op.batch_alter_table(
+        'change',
+        schema=None,
+        recreate='always',
+        table_kwargs={'sqlite_autoincrement': True},
+    ) as batch_op:
+        batch_op.alter_column('version_id',
+               existing_type=sa.String(length=32),
+               type_=sa.Integer(),
+               existing_nullable=True)
+
+    restore_sequences(sequences)
+
+    with op.get_context().autocommit_block():
+        op.execute('PRAGMA foreign_keys=ON')
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute('PRAGMA foreign_keys=OFF')
+
+    # the integer versions are kept as text
+    sequences = get_sequences()
+
+    with op.batch_alter_table(
+        'change',
+        schema=None,
+        recreate='always',
+        table_kwargs={'sqlite_autoincrement': True},
+    ) as batch_op:
+        batch_op.alter_column('version_id',
+               existing_type=sa.Integer(),
+               type_=sa.String(length=32),
+               existing_nullable=True)
+
+    for table in reversed(TABLES):
+        with op.batch_alter_table(
+            table,
+            schema=None,
+            recreate='always',
+            table_kwargs={'sqlite_autoincrement': True},
+        ) as batch_op:
+            batch_op.create_index(f'ix_{table}_{table}_id', [f'{table}_id'], unique=True)
+            batch_op.alter_column('version_id',
+                   existing_type=sa.Integer(),
+                   type_=sa.String(length=32),
+                   existing_nullable=False)
+            if table == 'item':
+                batch_op.alter_column('type',
+                       existing_type=sa.SmallInteger(),
+                       type_=sa.VARCHAR(length=9),
+                       existing_nullable=False)
+
+    op.execute(
+        "UPDATE item SET type = CASE type "
+        "WHEN '0' THEN 'selection' WHEN '1' THEN 'number' ELSE 'text' END"
+    )
+
+    restore_sequences(sequences)
+
+    with op.get_context().autocommit_block():
+        op.execute('PRAGMA foreign_keys=ON')
@@ -0,0 +1,53 @@
+import pytest
+from flask import redirect, url_for
+
+from flask_list import create_application, database
+from flask_list.models import User
+
+# talisman redirects the http requests
+BASE_URL = "https://localhost"
+CONFIGURATION = """
+SECRET_KEY = "test"
+SQLALCHEMY_DATABASE_URI = "sqlite:///{database}"
+CACHE_TYPE = "SimpleCache"
+WTF_CSRF_ENABLED = False
+MAIL_SUPPRESS_SEND = True
+MAIL_BACKGROUND_SENDER = False
+DELETION_BACKGROUND = False
+"""
+
+
+@pytest.fixture
+def application(tmp_path):
+    (tmp_path / "flask-list.conf").write_text(
+        CONFIGURATION.format(database=tmp_path / "flask-list.db")
+    )
+    application = create_application(str(tmp_path))
+    application.testing = True
+    # defined by wsgi.py
+    application.add_url_rule("/", "index", lambda: redirect(url_for("list.read")))
+
+    with application.app_context():
+        database.create_all()
+        user = User(email="user@example.com", active=True)
+        user.set_password("password")
+        database.session.add(user)
+        database.session.commit()
+
+    yield application
+
+    with application.app_context():
+        database.engine.dispose()
+
+
+@pytest.fixture
+def client(application):
+    client = application.test_client()
+    response = client.post(
+        f"{BASE_URL}/auth/login",
+        data={"email": "user@example.com", "password": "password"},
+    )
+    assert response.status_code == 302
+    assert response.location == "/"
+
+    return client
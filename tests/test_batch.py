@@ -0,0 +1,166 @@
+from flask_list import database
+from flask_list.models import Category, Item, List
+from tests.conftest import BASE_URL
+
+
+def create_items(application, client, *names, type_=0):
+    # one list and one category of items, created by the routes
+    client.post(f"{BASE_URL}/list/create", data={"name": "list"})
+    with application.app_context():
+        list_id = List.query.filter_by(name="list").one().list_id
+    client.post(f"{BASE_URL}/category/create/{list_id}", data={"name": "category"})
+    with application.app_context():
+        category_id = Category.query.filter_by(name="category").one().category_id
+    for name in names:
+        client.post(
+            f"{BASE_URL}/item/create/{category_id}",
+            data={"name": name, "category_id": category_id, "type_": type_},
+        )
+    # the flashed messages are rendered once
+    client.get(f"{BASE_URL}/list/read")
+
+    with application.app_context():
+        return list_id, [
+            (item.item_id, str(item.version_id))
+            for item in Item.query.filter(Item.name.in_(names)).order_by(Item.name)
+        ]
+
+
+def get_item(application, item_id):
+    with application.app_context():
+        item = database.session.get(Item, item_id)
+        return item.selection, item.text, str(item.version_id)
+
+
+def test_batch(application, client):
+    list_id, [(item_id, version_id), (other_item_id, other_version_id)] = create_items(
+        application, client, "item", "other item"
+    )
+
+    response = client.post(
+        f"{BASE_URL}/item/batch",
+        json={
+            "mutations": [
+                {
+                    "action": "switch_selection",
+                    "item_id": item_id,
+                    "version_id": version_id,
+                },
+                {
+                    "action": "set_text",
+                    "item_id": other_item_id,
+                    "version_id": other_version_id,
+                    "text": "text",
+                },
+                # based on the same version as the first one
+                {
+                    "action": "set_text",
+                    "item_id": item_id,
+                    "version_id": version_id,
+                    "text": "other text",
+                },
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json["status"] == "ok"
+    selection, text, new_version_id = get_item(application, item_id)
+    other_selection, other_text, other_new_version_id = get_item(
+        application, other_item_id
+    )
+    assert [
+        (result["item_id"], result["status"], str(result["version"]))
+        for result in response.json["results"]
+    ] == [(item_id, "ok", new_version_id), (other_item_id, "ok", other_new_version_id)]
+    # one new version per item
+    assert (selection, text) == (True, "other text")
+    assert (other_selection, other_text) == (False, "text")
+    assert new_version_id != version_id
+    assert other_new_version_id != other_version_id
+
+
+def test_batch_not_found(application, client):
+    list_id, [(item_id, version_id)] = create_items(application, client, "item")
+
+    response = client.post(
+        f"{BASE_URL}/item/batch",
+        json={
+            "mutations": [
+                {"action": "switch_selection", "item_id": 0, "version_id": "1"},
+                {
+                    "action": "switch_selection",
+                    "item_id": item_id,
+                    "version_id": version_id,
+                },
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json["status"] == "cancel"
+    assert response.json["cancel_url"] == "/list/read"
+    assert [
+        (result["item_id"], result["status"]) for result in response.json["results"]
+    ] == [(0, "not found"), (item_id, "ok")]
+    # the mutations of the other items are committed
+    selection, text, new_version_id = get_item(application, item_id)
+    assert (selection, new_version_id) == (
+        True,
+        str(response.json["results"][1]["version"]),
+    )
+
+
+def test_batch_stale(application, client):
+    list_id, [(item_id, version_id), (other_item_id, other_version_id)] = create_items(
+        application, client, "item", "other item"
+    )
+
+    response = client.post(
+        f"{BASE_URL}/item/batch",
+        json={
+            "mutations": [
+                {
+                    "action": "set_text",
+                    "item_id": item_id,
+                    "version_id": version_id,
+                    "text": "text",
+                },
+                # the item is only mutated if all its mutations are up to date
+                {
+                    "action": "switch_selection",
+                    "item_id": item_id,
+                    "version_id": "0",
+                },
+                {
+                    "action": "switch_selection",
+                    "item_id": other_item_id,
+                    "version_id": other_version_id,
+                },
+            ]
+        },
+    )
+
+    assert response.json["status"] == "cancel"
+    assert response.json["cancel_url"] == f"/list/detail/{list_id}"
+    assert [
+        (result["item_id"], result["status"]) for result in response.json["results"]
+    ] == [(item_id, "stale"), (other_item_id, "ok")]
+    assert get_item(application, item_id) == (False, "", version_id)
+    assert get_item(application, other_item_id)[0] is True
+
+
+def test_batch_invalid(application, client):
+    list_id, [(item_id, version_id)] = create_items(application, client, "item")
+
+    for mutation in (
+        {"action": "delete", "item_id": item_id, "version_id": version_id},
+        {"action": "set_text", "item_id": item_id, "version_id": version_id},
+        {"action": "switch_selection", "item_id": "item", "version_id": version_id},
+    ):
+        response = client.post(f"{BASE_URL}/item/batch", json={"mutations": [mutation]})
+
+        assert response.status_code == 400
+        assert response.json == {"status": "missing or invalid data"}
+
+    assert get_item(application, item_id) == (False, "", version_id)
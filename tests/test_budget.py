@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from flask_list.item import routes
+from tests.conftest import BASE_URL
+
+
+def test_budget_exceeded(application, client):
+    # read on each request, enabled after the first one
+    application.config["DATABASE_REQUEST_BUDGET"] = 0
+    application.config["DATABASE_BUDGET_STEPS"] = 1
+
+    response = client.get(f"{BASE_URL}/list/read")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+    response = client.post(
+        f"{BASE_URL}/item/switch_selection", json={"item_id": 1, "version_id": 1}
+    )
+
+    assert response.status_code == 503
+    assert response.json == {"status": "database time budget exceeded"}
+
+
+def test_budget_disabled(application, client):
+    application.config["DATABASE_REQUEST_BUDGET"] = None
+    application.config["DATABASE_BUDGET_STEPS"] = 1
+
+    response = client.get(f"{BASE_URL}/list/read")
+
+    assert response.status_code == 200
+
+
+def test_other_errors_not_handled(application, client, monkeypatch):
+    application.config["DATABASE_REQUEST_BUDGET"] = 5
+
+    def get_items():
+        raise OperationalError(
+            "SELECT", {}, sqlite3.OperationalError("database disk image is malformed")
+        )
+
+    monkeypatch.setattr(routes, "get_items", get_items)
+
+    # the usual handling of the errors: raised by the test client
+    with pytest.raises(OperationalError):
+        client.post(
+            f"{BASE_URL}/item/switch_selection", json={"item_id": 1, "version_id": 1}
+        )
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from flask_list import database
+from flask_list.models import Category, Change, List, User
+from tests.conftest import BASE_URL
+
+
+def create_list(application):
+    with application.app_context():
+        user = User.query.filter_by(email="user@example.com").one()
+        list_ = List(name="list", created_by=user.user_id, private=True)
+        database.session.add(Category(name="category", list_=list_))
+        database.session.commit()
+
+        return list_.list_id
+
+
+def get_changes(client, list_id, since):
+    return client.get(
+        f"{BASE_URL}/list/detail/{list_id}/changes", query_string={"since": since}
+    ).json
+
+
+def test_changes_since(application, client):
+    list_id = create_list(application)
+
+    data = get_changes(client, list_id, 0)
+
+    assert data["status"] == "ok"
+    assert [change["entity"] for change in data["changes"]] == ["category"]
+    assert get_changes(client, list_id, data["since"]) == {
+        "status": "ok",
+        "since": data["since"],
+        "changes": [],
+    }
+
+
+def test_cleaned_changes_reload_the_page(application, client):
+    list_id = create_list(application)
+    with application.app_context():
+        Change.query.update({"created_on": datetime.utcnow() - timedelta(days=2)})
+        database.session.commit()
+        (change_id,) = database.session.query(Change.change_id).one()
+
+    result = application.test_cli_runner().invoke(args=["list", "cleaning"])
+
+    assert result.exit_code == 0, result.output
+    with application.app_context():
+        assert Change.query.count() == 0
+        assert database.session.get(List, list_id).cleaned_change_id == change_id
+    # the category insert is gone: a partial feed would miss it
+    assert get_changes(client, list_id, 0) == {
+        "status": "cancel",
+        "cancel_url": f"/list/detail/{list_id}",
+    }
+    # the reloaded page syncs from the last deleted change
+    response = client.get(f"{BASE_URL}/list/detail/{list_id}")
+    assert f"var since = {change_id};" in response.text
+    assert get_changes(client, list_id, change_id)["status"] == "ok"
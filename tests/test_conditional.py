@@ -0,0 +1,71 @@
+import sys
+
+import pytest
+
+import flask_list.list.routes  # noqa: F401
+from flask_list.models import List
+from tests.conftest import BASE_URL
+from tests.test_batch import create_items
+
+
+def revalidate(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+
+    return client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_detail_not_modified(application, client, streaming):
+    application.config["LIST_STREAMING"] = streaming
+    list_id, items = create_items(application, client)
+    url = f"{BASE_URL}/list/detail/{list_id}"
+
+    response = revalidate(client, url)
+
+    assert response.status_code == 304
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+
+def test_detail_modified(application, client):
+    list_id, items = create_items(application, client)
+    url = f"{BASE_URL}/list/detail/{list_id}"
+    etag = client.get(url).headers["ETag"]
+
+    client.post(f"{BASE_URL}/category/create/{list_id}", data={"name": "other"})
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    # the flashed message isn't cached
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert revalidate(client, url).status_code == 304
+
+
+def test_read_not_modified(application, client, monkeypatch):
+    create_items(application, client)
+    url = f"{BASE_URL}/list/read"
+    etag = client.get(url).headers["ETag"]
+
+    def get_lists(*args):
+        raise AssertionError("the page is read")
+
+    # the package attribute is the detail routes module
+    monkeypatch.setattr(sys.modules["flask_list.list.routes"], "get_lists", get_lists)
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+
+
+def test_read_modified(application, client):
+    list_id, items = create_items(application, client)
+    url = f"{BASE_URL}/list/read"
+    etag = revalidate(client, url).headers["ETag"]
+
+    with application.app_context():
+        version_id = str(List.query.get(list_id).version_id)
+    client.post(f"{BASE_URL}/list/delete/{list_id}", data={"version_id": version_id})
+    client.get(url)
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
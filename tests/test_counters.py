@@ -0,0 +1,103 @@
+from flask_list import database
+from flask_list.models import Category, Item, List
+from tests.conftest import BASE_URL
+from tests.test_batch import create_items
+
+
+def get_counters(application, list_id):
+    with application.app_context():
+        list_ = database.session.get(List, list_id)
+        return (list_.category_count, list_.item_count), {
+            category.name: (
+                category.item_count,
+                category.selection_count,
+                category.selected_count,
+                category.number_count,
+                str(category.number_sum),
+            )
+            for category in Category.query.filter_by(list_id=list_id, deleting=False)
+        }
+
+
+def get_version(application, model, object_id):
+    with application.app_context():
+        return str(database.session.get(model, object_id).version_id)
+
+
+def test_counters(application, client):
+    list_id, [(item_id, version_id), (other_item_id, other_version_id)] = create_items(
+        application, client, "item", "other item", type_=1
+    )
+    client.post(f"{BASE_URL}/category/create/{list_id}", data={"name": "other"})
+    with application.app_context():
+        category_id = Category.query.filter_by(name="category").one().category_id
+        other_category_id = Category.query.filter_by(name="other").one().category_id
+    client.post(
+        f"{BASE_URL}/item/create/{other_category_id}",
+        data={"name": "item", "category_id": other_category_id, "type_": 0},
+    )
+    with application.app_context():
+        selection_item_id = (
+            Item.query.filter_by(category_id=other_category_id).one().item_id
+        )
+    client.post(
+        f"{BASE_URL}/item/switch_selection",
+        json={
+            "item_id": selection_item_id,
+            "version_id": get_version(application, Item, selection_item_id),
+        },
+    )
+    client.post(
+        f"{BASE_URL}/item/add_number", json={"item_id": item_id, "to_add": "1.5"}
+    )
+    client.post(
+        f"{BASE_URL}/item/add_number", json={"item_id": other_item_id, "to_add": "2"}
+    )
+
+    assert get_counters(application, list_id) == (
+        (2, 3),
+        {
+            "category": (2, 0, 0, 2, "3.5"),
+            "other": (1, 1, 1, 0, "0"),
+        },
+    )
+
+    # moved to the other category
+    client.post(
+        f"{BASE_URL}/item/update/{other_item_id}",
+        data={
+            "name": "other item",
+            "category_id": other_category_id,
+            "type_": 1,
+            "version_id": get_version(application, Item, other_item_id),
+        },
+    )
+
+    assert get_counters(application, list_id) == (
+        (2, 3),
+        {
+            "category": (1, 0, 0, 1, "1.5"),
+            "other": (2, 1, 1, 1, "2"),
+        },
+    )
+
+    client.post(
+        f"{BASE_URL}/item/delete/{selection_item_id}",
+        data={"version_id": get_version(application, Item, selection_item_id)},
+    )
+
+    assert get_counters(application, list_id) == (
+        (2, 2),
+        {
+            "category": (1, 0, 0, 1, "1.5"),
+            "other": (1, 0, 0, 1, "2"),
+        },
+    )
+
+    # the items of a deleted category are subtracted at once
+    client.post(
+        f"{BASE_URL}/category/delete/{category_id}",
+        data={"version_id": get_version(application, Category, category_id)},
+    )
+
+    assert get_counters(application, list_id) == ((1, 1), {"other": (1, 0, 0, 1, "2")})
@@ -0,0 +1,132 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from flask_list import database
+from flask_list.list.deletion import delete_pending
+from flask_list.models import Category, Item, List, User
+from tests.conftest import BASE_URL
+from tests.test_batch import create_items
+
+
+def get_rows(application, model, name):
+    with application.app_context():
+        return [
+            (row.deleting, row.version_id)
+            for row in model.query.filter(model.name == name).order_by(
+                model.deleting.desc()
+            )
+        ]
+
+
+def test_deleted_list_frees_its_name(application, client):
+    client.post(f"{BASE_URL}/list/create", data={"name": "list"})
+    with application.app_context():
+        list_ = List.query.filter_by(name="list").one()
+        list_id, version_id = list_.list_id, list_.version_id
+
+    client.post(
+        f"{BASE_URL}/list/delete/{list_id}", data={"version_id": str(version_id)}
+    )
+    # the background deleter is off, the list is only marked as deleting
+    response = client.post(f"{BASE_URL}/list/create", data={"name": "list"})
+
+    assert response.status_code == 302
+    assert get_rows(application, List, "list") == [(True, 1), (False, 1)]
+
+
+def test_deleted_category_frees_its_name(application, client):
+    client.post(f"{BASE_URL}/list/create", data={"name": "list"})
+    with application.app_context():
+        list_id = List.query.filter_by(name="list").one().list_id
+    client.post(f"{BASE_URL}/category/create/{list_id}", data={"name": "category"})
+    with application.app_context():
+        category = Category.query.filter_by(name="category").one()
+        category_id, version_id = category.category_id, category.version_id
+
+    client.post(
+        f"{BASE_URL}/category/delete/{category_id}",
+        data={"version_id": str(version_id)},
+    )
+    response = client.post(
+        f"{BASE_URL}/category/create/{list_id}", data={"name": "category"}
+    )
+
+    assert response.status_code == 302
+    assert get_rows(application, Category, "category") == [(True, 1), (False, 1)]
+    with application.app_context():
+        assert database.session.get(List, list_id).deleting is False
+
+
+def switch_selection(client, item_id, version_id):
+    return client.post(
+        f"{BASE_URL}/item/switch_selection",
+        json={"item_id": item_id, "version_id": version_id},
+    )
+
+
+def test_deleting_list_is_hidden(application, client):
+    list_id, [(item_id, version_id)] = create_items(application, client, "item")
+    assert b"/list/detail/" in client.get(f"{BASE_URL}/list/read").data
+
+    client.post(f"{BASE_URL}/list/delete/{list_id}", data={"version_id": "1"})
+
+    assert b"/list/detail/" not in client.get(f"{BASE_URL}/list/read").data
+    response = client.get(f"{BASE_URL}/list/detail/{list_id}")
+    assert (response.status_code, response.location) == (302, "/list/read")
+    assert switch_selection(client, item_id, version_id).json == {
+        "status": "cancel",
+        "cancel_url": "/list/read",
+    }
+
+    with application.app_context():
+        assert delete_pending(lambda message: None) == (0, 1)
+        assert database.session.get(List, list_id) is None
+        assert database.session.get(Item, item_id) is None
+
+
+def test_deleting_category_is_hidden(application, client):
+    list_id, [(item_id, version_id)] = create_items(application, client, "item")
+    with application.app_context():
+        category_id = Category.query.filter_by(name="category").one().category_id
+    link = f"/item/create/{category_id}".encode()
+    assert link in client.get(f"{BASE_URL}/list/detail/{list_id}").data
+
+    client.post(f"{BASE_URL}/category/delete/{category_id}", data={"version_id": "1"})
+
+    response = client.get(f"{BASE_URL}/list/detail/{list_id}")
+    assert response.status_code == 200
+    assert link not in response.data
+    assert switch_selection(client, item_id, version_id).json == {
+        "status": "cancel",
+        "cancel_url": "/list/read",
+    }
+
+    with application.app_context():
+        assert delete_pending(lambda message: None) == (1, 0)
+        assert database.session.get(Category, category_id) is None
+        assert database.session.get(List, list_id).deleting is False
+
+
+def test_names_unique_among_visible_rows(application):
+    with application.app_context():
+        user = User.query.filter_by(email="user@example.com").one()
+        database.session.add_all(
+            [
+                List(name="list", created_by=user.user_id, private=True),
+                List(name="list", created_by=user.user_id, private=True),
+            ]
+        )
+        with pytest.raises(IntegrityError):
+            database.session.commit()
+        database.session.rollback()
+
+        database.session.add_all(
+            [
+                List(name="list", created_by=user.user_id, private=True, deleting=True),
+                List(name="list", created_by=user.user_id, private=True, deleting=True),
+                List(name="list", created_by=user.user_id, private=True),
+            ]
+        )
+        database.session.commit()
+
+        assert List.query.filter_by(name="list").count() == 3
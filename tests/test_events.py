@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from flask_list import database
+from flask_list.list.detail import routes
+from flask_list.models import Change
+from tests.conftest import BASE_URL
+from tests.test_changes import create_list
+
+
+def test_events_disabled(application, client):
+    list_id = create_list(application)
+
+    response = client.get(f"{BASE_URL}/list/detail/{list_id}/events")
+
+    assert response.status_code == 204
+
+
+def test_events_since(application, client, monkeypatch):
+    application.config["LIST_EVENTS"] = True
+    list_id = create_list(application)
+    with application.app_context():
+        (change_id,) = database.session.query(Change.change_id).one()
+    # closed after the changes committed before the subscription
+    monkeypatch.setattr(routes, "EVENTS_DURATION", 0)
+
+    response = client.get(
+        f"{BASE_URL}/list/detail/{list_id}/events", query_string={"since": 0}
+    )
+
+    assert response.mimetype == "text/event-stream"
+    assert f"id: {change_id}\n" in response.text
+
+
+def test_cleaned_changes_reload_the_events(application, client, monkeypatch):
+    application.config["LIST_EVENTS"] = True
+    monkeypatch.setattr(routes, "EVENTS_DURATION", 0)
+    list_id = create_list(application)
+    with application.app_context():
+        Change.query.update({"created_on": datetime.utcnow() - timedelta(days=2)})
+        database.session.commit()
+    application.test_cli_runner().invoke(args=["list", "cleaning"])
+
+    response = client.get(
+        f"{BASE_URL}/list/detail/{list_id}/events", query_string={"since": 0}
+    )
+
+    assert "event: reload\n" in response.text
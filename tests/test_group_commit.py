@@ -0,0 +1,138 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from flask_list import broker, database
+from flask_list.item import routes
+from flask_list.models import Category, Item, ItemType, List, User
+from flask_list.retry import retry_counts
+from tests.conftest import BASE_URL
+
+
+def create_item(application, name="item"):
+    with application.app_context():
+        user = User.query.filter_by(email="user@example.com").one()
+        category = Category.query.filter_by(name="category").one_or_none()
+        if category is None:
+            list_ = List(name="list", created_by=user.user_id, private=True)
+            category = Category(name="category", list_=list_)
+            database.session.add(category)
+            # the list of the item is read from its category
+            database.session.flush()
+        item = Item(
+            name=name,
+            type_=ItemType.selection,
+            selection=False,
+            number=0,
+            text="",
+            category_id=category.category_id,
+        )
+        database.session.add(item)
+        database.session.commit()
+
+        return item.item_id, item.version_id
+
+
+def get_mutation(item_id, version_id):
+    return {
+        "action": "switch_selection",
+        "item_id": item_id,
+        "version_id": str(version_id),
+    }
+
+
+def test_group_commit_retries_busy_database(application, client, monkeypatch):
+    application.config["ITEM_GROUP_COMMIT"] = True
+    application.config["DATABASE_RETRY_DELAY"] = 0
+    item_id, version_id = create_item(application)
+
+    # the first commit of the writer fails as if another process held the lock
+    commit = database.session.commit
+    failures = [
+        OperationalError("COMMIT", {}, sqlite3.OperationalError("database is locked"))
+    ]
+
+    def busy_commit():
+        if failures:
+            raise failures.pop()
+        commit()
+
+    monkeypatch.setattr(database.session, "commit", busy_commit)
+    retried_on = retry_counts.get().get(("commit_mutations", "recovered"), 0)
+
+    response = client.post(
+        f"{BASE_URL}/item/switch_selection",
+        json={"item_id": item_id, "version_id": version_id},
+    )
+
+    assert response.status_code == 200
+    assert response.json == {
+        "status": "ok",
+        "selection": True,
+        "version": version_id + 1,
+    }
+    assert not failures
+    assert retry_counts.get()[("commit_mutations", "recovered")] == retried_on + 1
+    with application.app_context():
+        assert database.session.get(Item, item_id).selection is True
+
+
+def test_failed_mutation_rolls_back_alone(application, monkeypatch):
+    item_id, version_id = create_item(application, "item")
+    other_item_id, other_version_id = create_item(application, "other item")
+
+    def apply_mutation(item, mutation):
+        item.selection = not item.selection
+        if item.item_id == item_id:
+            raise ValueError("invalid mutation")
+
+    monkeypatch.setattr(routes, "apply_mutation", apply_mutation)
+
+    with application.app_context():
+        user = User.query.filter_by(email="user@example.com").one()
+        list_id = database.session.get(Item, item_id).list_id
+        subscription = broker.subscribe(f"list_{list_id}")
+        # one group: the failed mutation between two other ones
+        result, error, stale_result = routes.commit_mutations(
+            [
+                (get_mutation(other_item_id, other_version_id), user),
+                (get_mutation(item_id, version_id), user),
+                (get_mutation(other_item_id, other_version_id), user),
+            ]
+        )
+
+        assert isinstance(error, ValueError)
+        assert (result["status"], result["version"]) == ("ok", other_version_id + 1)
+        # checked against the version of the previous mutation of the group
+        assert stale_result == {"status": "stale", "list_id": list_id}
+        database.session.remove()
+        assert database.session.get(Item, item_id).selection is False
+        assert database.session.get(Item, other_item_id).selection is True
+        # only the change of the committed mutation is published
+        change = broker.backend.listen(subscription, 0)
+        assert (change["entity_id"], change["version_id"]) == (
+            other_item_id,
+            other_version_id + 1,
+        )
+        assert broker.backend.listen(subscription, 0) is None
+
+
+def test_failed_group_publishes_nothing(application, monkeypatch):
+    item_id, version_id = create_item(application)
+
+    def failed_commit():
+        raise OperationalError("COMMIT", {}, sqlite3.OperationalError("disk I/O error"))
+
+    with application.app_context():
+        user = User.query.filter_by(email="user@example.com").one()
+        list_id = database.session.get(Item, item_id).list_id
+        subscription = broker.subscribe(f"list_{list_id}")
+        monkeypatch.setattr(database.session, "commit", failed_commit)
+
+        with pytest.raises(OperationalError):
+            routes.commit_mutations([(get_mutation(item_id, version_id), user)])
+        database.session.rollback()
+
+        # the released savepoint isn't committed
+        assert broker.backend.listen(subscription, 0) is None
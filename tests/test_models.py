@@ -0,0 +1,67 @@
+from flask_list import database
+from flask_list.models import Category, Item, ItemType, List, User
+
+
+def create_lists(count):
+    user = User.query.filter_by(email="user@example.com").one()
+    lists = [
+        List(name=f"list {index}", created_by=user.user_id, private=True)
+        for index in range(count)
+    ]
+    database.session.add_all(lists)
+    database.session.commit()
+
+    return lists
+
+
+def create_item(name="item", **kwargs):
+    return Item(
+        name=name,
+        type_=ItemType.selection,
+        selection=False,
+        number=0,
+        text="",
+        **kwargs,
+    )
+
+
+def test_list_id_from_category_id(application):
+    with application.app_context():
+        list_, other_list = create_lists(2)
+        category = Category(name="category", list_id=list_.list_id)
+        other_category = Category(name="category", list_id=other_list.list_id)
+        database.session.add_all([category, other_category])
+        database.session.commit()
+
+        item = create_item(category_id=category.category_id)
+        database.session.add(item)
+        database.session.commit()
+        assert item.list_id == list_.list_id
+
+        # moved with the category loaded
+        assert item.category is category
+        item.category_id = other_category.category_id
+        database.session.commit()
+        assert item.list_id == other_list.list_id
+
+
+def test_list_id_from_category(application):
+    with application.app_context():
+        list_, other_list = create_lists(2)
+        # new categories of known lists, their ids are set by the flush
+        category = Category(name="category", list_=list_)
+        item = create_item(category=category)
+        database.session.add(item)
+        database.session.commit()
+        assert item.list_id == list_.list_id
+
+        other_category = Category(name="category", list_id=other_list.list_id)
+        database.session.add(other_category)
+        database.session.commit()
+
+        item.category = other_category
+        database.session.commit()
+        assert (item.category_id, item.list_id) == (
+            other_category.category_id,
+            other_list.list_id,
+        )
@@ -0,0 +1,115 @@
+from decimal import Decimal, DecimalException
+
+import pytest
+
+from flask_list import database
+from flask_list.item.routes import parse_number
+from flask_list.models import Item
+from tests.conftest import BASE_URL
+from tests.test_batch import create_items
+
+
+@pytest.mark.parametrize(
+    "value, number",
+    [
+        ("1.5", Decimal("1.5")),
+        ("-0.000001", Decimal("-0.000001")),
+        ("999999999999.999999", Decimal("999999999999.999999")),
+        ("-999999999999.999999", Decimal("-999999999999.999999")),
+    ],
+)
+def test_parse_number(value, number):
+    assert parse_number(value) == number
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["1000000000000", "-1e12", "0.0000001", "NaN", "Infinity", "number", None],
+)
+def test_parse_invalid_number(value):
+    with pytest.raises((TypeError, ValueError, DecimalException)):
+        parse_number(value)
+
+
+def add_number(client, item_id, to_add):
+    return client.post(
+        f"{BASE_URL}/item/add_number", json={"item_id": item_id, "to_add": to_add}
+    )
+
+
+def get_number(application, item_id):
+    with application.app_context():
+        item = database.session.get(Item, item_id)
+        return item.number, str(item.version_id)
+
+
+def test_add_number(application, client):
+    list_id, [(item_id, version_id)] = create_items(
+        application, client, "item", type_=1
+    )
+
+    # no version sent: the increments don't conflict
+    assert add_number(client, item_id, "1.5").json["status"] == "ok"
+    response = add_number(client, item_id, "-0.25")
+
+    assert (response.json["status"], response.json["number"]) == ("ok", "1.25")
+    assert get_number(application, item_id) == (
+        Decimal("1.25"),
+        str(response.json["version"]),
+    )
+
+
+def test_add_number_bounds(application, client):
+    list_id, [(item_id, version_id)] = create_items(
+        application, client, "item", type_=1
+    )
+    assert add_number(client, item_id, "999999999999").json["status"] == "ok"
+    number = get_number(application, item_id)
+
+    # the sum would be out of range, the number is kept
+    response = add_number(client, item_id, "1")
+
+    assert response.json == {
+        "status": "cancel",
+        "cancel_url": f"/list/detail/{list_id}",
+    }
+    assert get_number(application, item_id) == number
+
+    response = add_number(client, item_id, "-2000000000000")
+
+    assert response.status_code == 400
+    assert get_number(application, item_id) == number
+    assert number[0] == Decimal("999999999999")
+
+
+def test_add_number_to_another_type(application, client):
+    list_id, [(item_id, version_id)] = create_items(application, client, "item")
+
+    response = add_number(client, item_id, "1")
+
+    assert response.status_code == 400
+    assert get_number(application, item_id) == (Decimal(0), version_id)
+
+
+def test_set_number_bounds(application, client):
+    list_id, [(item_id, version_id)] = create_items(
+        application, client, "item", type_=1
+    )
+
+    response = client.post(
+        f"{BASE_URL}/item/batch",
+        json={
+            "mutations": [
+                {
+                    "action": "set_number",
+                    "item_id": item_id,
+                    "version_id": version_id,
+                    "number": "999999999999",
+                    "to_add": "1",
+                }
+            ]
+        },
+    )
+
+    assert response.status_code == 400
+    assert get_number(application, item_id) == (Decimal(0), version_id)
@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+from datetime import datetime
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+
+from flask_list import mail
+from flask_list.models import Email
+from flask_list.outbox.sender import queue_email, send_emails
+
+
+def queue_emails(application, count):
+    with application.app_context():
+        for index in range(count):
+            queue_email(
+                f"subject {index}",
+                "sender@example.com",
+                [f"user{index}@example.com"],
+                "text",
+                "html",
+            )
+
+
+def connect(errors, sent):
+    # the errors raised by the messages, in order
+    class Connection:
+        def send(self, message):
+            error = errors.pop(0)
+            if error is not None:
+                raise error
+            sent.append(message.subject)
+
+    @contextmanager
+    def connection():
+        yield Connection()
+
+    return connection
+
+
+def get_emails(application):
+    with application.app_context():
+        return [
+            (email.subject, email.attempts, email.send_after > datetime.utcnow())
+            for email in Email.query.order_by(Email.email_id)
+        ]
+
+
+def test_send_emails(application, monkeypatch):
+    queue_emails(application, 2)
+    sent = []
+    monkeypatch.setattr(mail, "connect", connect([None, None], sent))
+
+    with application.app_context():
+        assert send_emails() == (2, 0)
+
+    assert sent == ["subject 0", "subject 1"]
+    assert get_emails(application) == []
+
+
+def test_refused_email_is_retried(application, monkeypatch):
+    queue_emails(application, 2)
+    sent = []
+    refused = SMTPRecipientsRefused({"user0@example.com": (550, b"unknown")})
+    monkeypatch.setattr(mail, "connect", connect([refused, None], sent))
+
+    with application.app_context():
+        assert send_emails() == (1, 1)
+
+    assert sent == ["subject 1"]
+    # the attempt is counted, retried after a delay
+    assert get_emails(application) == [("subject 0", 1, True)]
+
+
+def test_disconnection_releases_the_batch(application, monkeypatch):
+    queue_emails(application, 3)
+    sent = []
+    disconnected = SMTPServerDisconnected("Connection unexpectedly closed")
+    monkeypatch.setattr(mail, "connect", connect([None, disconnected], sent))
+
+    with application.app_context():
+        assert send_emails() == (1, 2)
+        last_errors = {email.last_error for email in Email.query}
+
+    assert sent == ["subject 0"]
+    # no attempt counted for the emails of the dropped connection
+    assert get_emails(application) == [("subject 1", 0, True), ("subject 2", 0, True)]
+    assert last_errors == {repr(disconnected)}
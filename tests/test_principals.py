@@ -0,0 +1,50 @@
+from flask_list.auth.principals import PrincipalCache
+from flask_list.models import Principal
+
+
+def get_loader(loads, version_id=1):
+    def load(user_id):
+        loads.append(user_id)
+        return Principal(user_id, "user@example.com", True, version_id)
+
+    return load
+
+
+def test_local_tier(application):
+    # two processes sharing the cache
+    cache, other_cache = PrincipalCache(), PrincipalCache()
+    loads = []
+
+    with application.app_context():
+        principal = cache.get(1, get_loader(loads))
+        assert cache.get(1, get_loader(loads)) is principal
+        assert other_cache.get(1, get_loader(loads)).version_id == 1
+
+    # the second process reads the shared cache, not the database
+    assert loads == [1]
+
+
+def test_password_change_evicts_other_processes(application):
+    cache, other_cache = PrincipalCache(), PrincipalCache()
+    loads = []
+
+    with application.app_context():
+        cache.get(1, get_loader(loads))
+        other_cache.set(Principal(1, "user@example.com", True, 2))
+
+        assert cache.get(1, get_loader(loads)).version_id == 2
+
+    assert loads == [1]
+
+
+def test_logout_evicts_other_processes(application):
+    cache, other_cache = PrincipalCache(), PrincipalCache()
+    loads = []
+
+    with application.app_context():
+        cache.get(1, get_loader(loads))
+        other_cache.delete(1)
+
+        assert cache.get(1, get_loader(loads, 3)).version_id == 3
+
+    assert loads == [1, 1]
@@ -0,0 +1,74 @@
+import json
+
+
+def get_trace(client, time, method, endpoint, arguments=None, payload=None):
+    return {
+        "time": time,
+        "client": client,
+        "method": method,
+        "endpoint": endpoint,
+        "arguments": arguments or {},
+        "query": [],
+        "payload": payload,
+    }
+
+
+def test_replay_seeded_scratch_database(application, tmp_path):
+    application.config["DEV_SCRATCH_DATABASE"] = True
+    # the shipped configuration
+    application.config["WTF_CSRF_ENABLED"] = True
+    traces = [
+        get_trace("#a", 0, "GET", "list.read"),
+        get_trace("#a", 1, "GET", "list.detail", {"list_id": "#l"}),
+        get_trace(
+            "#a",
+            2,
+            "POST",
+            "item.switch_selection",
+            payload={"item_id": "#i", "version_id": "int"},
+        ),
+        get_trace(
+            "#b",
+            3,
+            "POST",
+            "item.batch",
+            payload={
+                "mutations": [
+                    {
+                        "action": "set_text",
+                        "item_id": "#j",
+                        "version_id": "int",
+                        "text": "str",
+                    }
+                ]
+            },
+        ),
+        # no version: rejected as stale by the view
+        get_trace("#b", 4, "POST", "item.switch_selection", payload={"item_id": "#i"}),
+    ]
+    trace_path = tmp_path / "trace.jsonl"
+    trace_path.write_text("".join(json.dumps(trace) + "\n" for trace in traces))
+    output_path = tmp_path / "results.json"
+
+    result = application.test_cli_runner().invoke(
+        args=[
+            "dev",
+            "replay",
+            str(trace_path),
+            "--threads",
+            "2",
+            "--speed",
+            "0",
+            "--items",
+            "20",
+            "--output",
+            str(output_path),
+        ]
+    )
+
+    assert result.exit_code == 0, result.output
+    results = json.loads(output_path.read_text())
+    assert results["requests"] == 5
+    assert results["statuses"] == {"200": 2, "ok": 2, "cancel": 1}
+    assert results["stale_rate"] == 1 / 5
+    assert results["exceptions"] == {}